@@ -6,6 +6,12 @@ import requests
 from tkintermapview import TkinterMapView
 from PIL import Image, ImageTk
 from booking_queue_database import BookingDatabase
+from booking_writer import get_booking_writer
+from geocode_cache import get_geocode_cache
+from route_cache import get_route_cache
+from autocomplete_worker import get_autocomplete_dispatcher
+from http_client import get_http_client
+import settings
 
 class TransportBookingSystem(tk.Frame):
     def __init__(self, parent, controller):
@@ -18,6 +24,12 @@ class TransportBookingSystem(tk.Frame):
         self.parent_window = parent.winfo_toplevel()
         
         self.db = BookingDatabase()
+        # Uploads run on a background thread; results come back through the Tk event loop
+        self.writer = get_booking_writer()
+        self.writer.bind_to_tk(self.parent_window)
+        # Autocomplete lookups also run in the background and report back the same way
+        self.autocompleter = get_autocomplete_dispatcher()
+        self.autocompleter.bind_to_tk(self.parent_window)
         # Initialize all widget references first
         self.pickup_time_btn = None
         self.dropoff_time_btn = None
@@ -28,7 +40,7 @@ class TransportBookingSystem(tk.Frame):
         print(f"Booking system initialized for user: {self.controller.current_user_name} (ID: {self.controller.current_user_id})")
         
         # API Key for OpenRouteService
-        self.ORS_API_KEY = "5b3ce3597851110001cf624821c48bd478e94f3692170e872d0eeca3"
+        self.ORS_API_KEY = settings.ORS_API_KEY
         
         # Initialize other variables
         self.booking_mode = True
@@ -679,13 +691,23 @@ class TransportBookingSystem(tk.Frame):
     
     def autocomplete(self, query):
         """Get autocomplete suggestions from OpenRouteService"""
-        url = "https://api.openrouteservice.org/geocode/autocomplete"
-        params = {"api_key": self.ORS_API_KEY, "text": query, "size": 5}
+        # Popular places are answered from the on-disk cache, often from an earlier, shorter prefix
+        cache = get_geocode_cache()
+        cached = cache.get(query)
+        if cached is not None:
+            return cached
+
+        url = f"{settings.ORS_BASE_URL}/geocode/autocomplete"
+        size = 5
+        params = {"api_key": self.ORS_API_KEY, "text": query, "size": size}
         try:
-            response = requests.get(url, params=params, timeout=5)
+            response = get_http_client().get("autocomplete", url, params=params)
             response.raise_for_status()
             results = response.json().get("features", [])
-            return [(res["properties"]["label"], res["geometry"]["coordinates"]) for res in results]
+            suggestions = [(res["properties"]["label"], res["geometry"]["coordinates"]) for res in results]
+            # Fewer than size results means ORS knows no other match, so longer queries can filter these
+            cache.put(query, suggestions, complete=len(suggestions) < size)
+            return suggestions
         except Exception as e:
             print(f"Autocomplete error: {e}")
             return []
@@ -693,6 +715,27 @@ class TransportBookingSystem(tk.Frame):
     def delayed_autocomplete(self, entry, listbox, coords_list, is_pickup):
         """Delayed autocomplete to reduce API calls"""
         query = entry.get()
+        field = "pickup" if is_pickup else "destination"
+
+        if len(query) < 3:
+            # Nothing to look up; a lookup still in flight must not fill the list afterwards
+            self.autocompleter.cancel(field)
+            self.show_suggestions(listbox, coords_list, [])
+            return
+
+        # Cached places are shown straight away; anything else is looked up off the Tk thread
+        cached = get_geocode_cache().get(query)
+        if cached is not None:
+            self.autocompleter.cancel(field)
+            self.show_suggestions(listbox, coords_list, cached)
+            return
+        self.autocompleter.submit(
+            field, query, self.autocomplete,
+            lambda query, suggestions: self.show_suggestions(listbox, coords_list, suggestions)
+        )
+
+    def show_suggestions(self, listbox, coords_list, suggestions):
+        """Fill a suggestion list, always starting with the current location option"""
         listbox.delete(0, tk.END)
         coords_list.clear()
 
@@ -700,15 +743,14 @@ class TransportBookingSystem(tk.Frame):
         listbox.insert(tk.END, "📍 Use My Current Location")
         coords_list.append("current_location")
 
-        if len(query) >= 3:
-            for name, coords in self.autocomplete(query):
-                listbox.insert(tk.END, name)
-                coords_list.append(coords)
+        for name, coords in suggestions:
+            listbox.insert(tk.END, name)
+            coords_list.append(coords)
     
     def get_current_location(self):
         """Get approximate current location using IP"""
         try:
-            response = requests.get("https://ipinfo.io/json", timeout=5)
+            response = get_http_client().get("ipinfo", settings.IPINFO_URL)
             loc = response.json().get("loc")
             if loc:
                 return tuple(map(float, loc.split(",")))
@@ -811,7 +853,13 @@ class TransportBookingSystem(tk.Frame):
     
     def get_route_coords(self, start, end):
         """Get route coordinates from OpenRouteService"""
-        url = "https://api.openrouteservice.org/v2/directions/driving-car"
+        # A trip between (nearly) the same two points as before is served from the route cache
+        cache = get_route_cache()
+        cached = cache.get(start, end)
+        if cached is not None:
+            return cached
+
+        url = f"{settings.ORS_BASE_URL}/v2/directions/driving-car"
         headers = {"Authorization": self.ORS_API_KEY}
         params = {
             "start": f"{start[1]},{start[0]}", 
@@ -820,7 +868,7 @@ class TransportBookingSystem(tk.Frame):
         }
         
         try:
-            response = requests.get(url, headers=headers, params=params, timeout=10)
+            response = get_http_client().get("directions", url, params=params, headers=headers)
             response.raise_for_status()
             data = response.json()
             
@@ -832,6 +880,7 @@ class TransportBookingSystem(tk.Frame):
             coords = [(coord[1], coord[0]) for coord in feature["geometry"]["coordinates"]]
             distance_km = feature["properties"]["segments"][0]["distance"] / 1000
             duration_min = feature["properties"]["segments"][0]["duration"] / 60
+            cache.put(start, end, coords, distance_km, duration_min)
             
             return coords, distance_km, duration_min
             
@@ -1080,25 +1129,19 @@ class TransportBookingSystem(tk.Frame):
                 style='Secondary.TButton',
                 command=receipt_window.destroy).pack(side=tk.RIGHT, padx=5)
         
-        # Upload to Sheets in background
-        def upload_to_sheets():
-            try:
-                if not self.db.add_booking(booking):
-                    messagebox.showerror("Database Error", 
-                                    "Failed to save booking to database", 
-                                    parent=receipt_window)
-                else:
-                    self.bookings.append(booking)
-                    # Update receipt with success message
-                    receipt_text.config(state=tk.NORMAL)
-                    receipt_text.insert(tk.END, "\n\n✓ Saved to database successfully!")
-                    receipt_text.config(state=tk.DISABLED)
-            except Exception as e:
-                receipt_text.config(state=tk.NORMAL)
-                receipt_text.insert(tk.END, f"\n\n⚠️ Database Error: {str(e)}")
-                receipt_text.config(state=tk.DISABLED)
-        
-        self.parent_window.after(300, upload_to_sheets)
+        # Upload to Sheets in background; the booking is already safe in the local spool
+        def on_upload_finished(booking_id, saved, error):
+            if not receipt_window.winfo_exists():
+                return
+            receipt_text.config(state=tk.NORMAL)
+            if saved:
+                receipt_text.insert(tk.END, "\n\n✓ Saved to database successfully!")
+            else:
+                receipt_text.insert(tk.END, f"\n\n⚠️ Database Error: {error}\nSaved on this device, will retry automatically.")
+            receipt_text.config(state=tk.DISABLED)
+
+        self.bookings.append(booking)
+        self.writer.submit(booking, on_upload_finished)
 
     def cancel_booking(self, booking_id, receipt_window):
         """Simple cancellation method"""
@@ -1107,8 +1150,9 @@ class TransportBookingSystem(tk.Frame):
             return False
         
         try:
-            # Update status in database
-            if not self.db.update_booking_status(str(booking_id), "Cancelled"):
+            # Update status in the spool if the booking hasn't been uploaded yet, otherwise in the database
+            if not self.writer.update_pending_status(str(booking_id), "Cancelled") and \
+                    not self.db.update_booking_status(str(booking_id), "Cancelled"):
                 messagebox.showerror("Error", "Could not update booking status")
                 return False
             
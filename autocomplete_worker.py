@@ -0,0 +1,89 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import settings
+from tk_pump import pump_on_tk
+
+# Runs autocomplete lookups on a small thread pool so typing never waits on OpenRouteService.
+# Every request is tagged with a per-field sequence number; when a result comes back for a query the
+# user has already typed past, it is dropped instead of overwriting newer suggestions.
+class AutocompleteDispatcher:
+    def __init__(self, workers=None):
+        self.__pool = ThreadPoolExecutor(max_workers=workers or settings.AUTOCOMPLETE_WORKERS, thread_name_prefix="autocomplete")
+        self.__lock = threading.Lock()
+        self.__latest = {}  # Field name -> sequence number of its newest request
+        self.__results = queue.Queue()  # Finished lookups waiting to be handed back to the Tk thread
+        self.__tk_root = None
+
+    def __next_sequence(self, field):
+        with self.__lock:
+            sequence = self.__latest.get(field, 0) + 1
+            self.__latest[field] = sequence
+            return sequence
+
+    def is_current(self, field, sequence):
+        with self.__lock:
+            return self.__latest.get(field) == sequence
+
+    def submit(self, field, query, lookup, on_result):
+        """Run lookup(query) on the pool; on_result(query, suggestions) runs on the Tk thread unless superseded"""
+        sequence = self.__next_sequence(field)
+
+        def run():
+            # A newer request for the field may have arrived while this one was queued
+            if not self.is_current(field, sequence):
+                return
+            try:
+                suggestions = lookup(query)
+            except Exception as e:
+                print(f"Autocomplete error: {e}")
+                suggestions = []
+            self.__results.put((field, sequence, query, suggestions, on_result))
+
+        self.__pool.submit(run)
+        return sequence
+
+    def cancel(self, field):
+        """Drop whatever is still in flight for a field, e.g. after its text was cleared or answered from cache"""
+        self.__next_sequence(field)
+
+    def bind_to_tk(self, root, interval_ms=50):
+        """Deliver lookup results from the Tk event loop of root"""
+        if self.__tk_root is root:
+            return
+        self.__tk_root = root
+
+        def step():
+            if self.__tk_root is not root:
+                return False
+            self.dispatch_results()
+
+        pump_on_tk(root, step, interval_ms, on_closed=self.__unbind_tk)
+
+    def __unbind_tk(self):
+        self.__tk_root = None
+
+    def dispatch_results(self):
+        """Run on_result for every finished lookup that is still the newest for its field"""
+        while True:
+            try:
+                field, sequence, query, suggestions, on_result = self.__results.get_nowait()
+            except queue.Empty:
+                return
+            if not self.is_current(field, sequence):
+                continue
+            try:
+                on_result(query, suggestions)
+            except Exception as e:
+                print(f"Autocomplete callback error: {e}")
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_autocomplete_dispatcher():
+    """The process-wide autocomplete dispatcher"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = AutocompleteDispatcher()
+        return _dispatcher
@@ -0,0 +1,248 @@
+import argparse
+import contextlib
+import io
+import random
+import time
+from types import SimpleNamespace
+import settings
+from booking_queue_database import BOOKING_HEADERS, BookingDatabase, reset_booking_cache
+from storage_backends import use_storage
+from user_info_database import reset_user_index
+from id_allocator import reset_id_allocator
+from login_guard import reset_login_guard
+from geocode_cache import reset_geocode_cache
+from http_client import reset_http_client
+from route_cache import reset_route_cache
+from history_store import reset_history_store
+from fake_services import ApiStats, FakeWorksheet, StubORSServer
+
+# Offline benchmarks for the booking, user, history and routing code paths.
+# Sheets is replaced by FakeWorksheet and OpenRouteService by StubORSServer, so nothing touches production.
+#
+#   python benchmark_suite.py --sizes 1000,10000,100000 --latency 0.05 --ops 20
+
+USER_HEADERS = ["ID", "Name", "Contact", "Email", "Passcode", "Address"]
+SCENARIOS = ["add", "update", "cancel", "lookup", "history", "query", "analytics", "login", "badlogin", "signup", "route"]
+BOOKINGS_PER_CLIENT = 25
+# Trips people book again and again: (pickup, dropoff) as (lat, lon)
+POPULAR_TRIPS = [
+    ((14.5547, 121.0244), (14.5849, 121.0569)),  # Makati CBD to SM Megamall
+    ((14.5086, 121.0198), (14.5509, 121.0503)),  # NAIA Terminal 3 to BGC
+    ((14.6507, 121.0494), (14.5547, 121.0244)),  # Quezon Memorial Circle to Makati CBD
+]
+PLACES = ["SM Megamall", "NAIA Terminal 3", "Makati City Hall", "Bonifacio High Street", "Quezon Memorial Circle"]
+
+def booking_id_for(number):
+    return str(100000 + number)
+
+def client_id_for(number, size):
+    return 1000 + number % max(1, size // BOOKINGS_PER_CLIENT)
+
+def booking_row(number, size):
+    client_id = client_id_for(number, size)
+    return [
+        booking_id_for(number), client_id, f"Client {client_id}", "Makati City", "Quezon City",
+        random.choice(["Car", "Motorcycle", "Van"]), f"Driver {number % 50}", 12.5, 210.0, "Instant",
+        "2025-05-01 08:00", "ASAP", random.choice(["Confirmed", "Completed", "Cancelled"]),
+        "2025-05-01 07:55:00"
+    ]
+
+def booking_dict(number, size, status="Confirmed", fare=210.0):
+    client_id = client_id_for(number, size)
+    return {
+        "id": booking_id_for(number), "client_id": client_id, "client_name": f"Client {client_id}",
+        "pickup": "Makati City", "dropoff": "Quezon City", "vehicle": "Car",
+        "driver": {"name": f"Driver {number % 50}"}, "distance": 12.5, "fare": fare,
+        "type": "Instant", "pickup_time": "2025-05-01 08:00", "status": status
+    }
+
+def user_row(number):
+    return [str(1000 + number), f"User {number}", "09171234567", f"user{number}@example.com", f"pass{number}", "Manila"]
+
+class Workload:
+    """Seeded fake sheets for one dataset size"""
+
+    def __init__(self, size, latency, bytes_per_second):
+        self.size = size
+        self.stats = ApiStats()
+        self.bookings = FakeWorksheet(len(BOOKING_HEADERS), latency, bytes_per_second, self.stats)
+        self.users = FakeWorksheet(len(USER_HEADERS), latency, bytes_per_second, self.stats)
+        self.id_leases = FakeWorksheet(2, latency, bytes_per_second, self.stats)
+        self.bookings.seed([BOOKING_HEADERS] + [booking_row(number, size) for number in range(size)])
+        self.users.seed([USER_HEADERS] + [user_row(number) for number in range(size)])
+        self.next_booking = size
+
+    def install(self):
+        use_storage("bookings", self.bookings)
+        use_storage("users", self.users)
+        use_storage("id_leases", self.id_leases)
+        reset_booking_cache()
+        reset_user_index()
+        reset_id_allocator()
+        reset_login_guard()
+        reset_geocode_cache()
+        reset_http_client()
+        reset_route_cache()
+        reset_history_store()
+
+    def random_booking(self):
+        return random.randrange(self.size)
+
+    def new_booking(self):
+        number = self.next_booking
+        self.next_booking += 1
+        return number
+
+def scenario_add(workload, ops):
+    database = BookingDatabase()
+    for _ in range(ops):
+        database.add_booking(booking_dict(workload.new_booking(), workload.size))
+
+def scenario_update(workload, ops):
+    database = BookingDatabase()
+    for _ in range(ops):
+        database.update_booking(booking_dict(workload.random_booking(), workload.size, fare=round(random.uniform(100, 500), 2)))
+
+def scenario_cancel(workload, ops):
+    database = BookingDatabase()
+    for _ in range(ops):
+        database.update_booking_status(booking_id_for(workload.random_booking()), "Cancelled")
+
+def scenario_lookup(workload, ops):
+    database = BookingDatabase()
+    for _ in range(ops):
+        database.get_booking_by_id(booking_id_for(workload.random_booking()))
+
+def scenario_history(workload, ops):
+    from view_history import ManageHistory
+    for _ in range(ops):
+        ManageHistory(client_id_for(workload.random_booking(), workload.size)).fetch_rows()
+
+def scenario_query(workload, ops):
+    database = BookingDatabase()
+    for _ in range(ops):
+        # A dashboard-style question: which vehicles are out on confirmed rides
+        database.find_bookings({"Status": "Confirmed"}, headers=["Booking ID", "Vehicle Type"])
+
+def scenario_analytics(workload, ops):
+    from booking_analytics import BookingAnalytics
+    for _ in range(ops):
+        analytics = BookingAnalytics.load()
+        analytics.totals()
+        analytics.by_vehicle()
+        analytics.by_date("month")
+
+def scenario_login(workload, ops):
+    from user_info_database import UserInfoDatabase
+    database = UserInfoDatabase()
+    for _ in range(ops):
+        number = random.randrange(workload.size)
+        database.find_user_by_credentials(str(1000 + number), f"user{number}@example.com", f"pass{number}")
+
+def scenario_badlogin(workload, ops):
+    from user_info_database import UserInfoDatabase
+    database = UserInfoDatabase()
+    # A kiosk user retrying a mistyped password, and a script guessing passwords for one ID
+    for attempt in range(ops):
+        if attempt % 2:
+            database.find_user_by_credentials("1000", "user0@example.com", "pass-typo")
+        else:
+            database.find_user_by_credentials("1001", "user1@example.com", f"guess{attempt}")
+
+def scenario_signup(workload, ops):
+    from user_info_database import UserInfoDatabase
+    database = UserInfoDatabase()
+    for _ in range(ops):
+        number = random.randrange(workload.size)
+        database.upload_user(f"New User {number}", "09171234567", f"new{number}@example.com", f"pass{number}", "Manila")
+
+def scenario_route(workload, ops):
+    from appointment_page import TransportBookingSystem
+    # The routing helpers only need the API key from the page, so call them without building any widgets
+    page = SimpleNamespace(ORS_API_KEY="benchmark")
+    for _ in range(ops):
+        if random.random() < 0.5:
+            # A repeat of a popular trip, picked a few metres from where it was picked last time
+            start, end = random.choice(POPULAR_TRIPS)
+            start = (start[0] + random.uniform(-2e-5, 2e-5), start[1] + random.uniform(-2e-5, 2e-5))
+            end = (end[0] + random.uniform(-2e-5, 2e-5), end[1] + random.uniform(-2e-5, 2e-5))
+        else:
+            start = (14.55 + random.random() / 10, 121.0 + random.random() / 10)
+            end = (14.60 + random.random() / 10, 121.05 + random.random() / 10)
+        # Someone typing a popular place: the debounce fires on a couple of prefixes, then the full name
+        place = random.choice(PLACES)
+        for length in (4, 7, len(place)):
+            TransportBookingSystem.autocomplete(page, place[:length])
+        TransportBookingSystem.get_route_coords(page, start, end)
+
+def run_scenario(name, workload, ops, server):
+    """Run one scenario on a cold cache and return (seconds, calls, bytes) per operation"""
+    workload.install()
+    stats = server.stats if name == "route" else workload.stats
+    calls_before, bytes_before, overhead_before = stats.snapshot()
+    started = time.perf_counter()
+
+    # The app prints as it goes (e.g. every history row); keep that out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        globals()[f"scenario_{name}"](workload, ops)
+
+    elapsed = time.perf_counter() - started
+    calls, transferred, overhead = stats.snapshot()
+    elapsed -= overhead - overhead_before
+    return elapsed / ops, (calls - calls_before) / ops, (transferred - bytes_before) / ops
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark Swift Booking against fake Sheets and OpenRouteService")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma separated row counts (up to 1000000)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated subset of " + ",".join(SCENARIOS))
+    parser.add_argument("--ops", type=int, default=20, help="operations per scenario")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every fake Sheets call")
+    parser.add_argument("--ors-latency", type=float, default=0.0, help="seconds added to every stub ORS request")
+    parser.add_argument("--bandwidth", type=float, default=None, help="simulated bytes per second for Sheets payloads")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    random.seed(args.seed)
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    scenarios = [name for name in args.scenarios.split(",") if name]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    server = StubORSServer(latency=args.ors_latency)
+    settings.ORS_BASE_URL = server.start()
+    settings.IPINFO_URL = f"{settings.ORS_BASE_URL}/json"
+    # Each run starts from empty geocoding, route and history stores that are never written to disk
+    settings.GEOCODE_CACHE_PATH = ":memory:"
+    settings.ROUTE_CACHE_PATH = ":memory:"
+    settings.HISTORY_STORE_PATH = ":memory:"
+
+    print(f"{'rows':>9} {'scenario':<9} {'ms/op':>10} {'calls/op':>9} {'KB/op':>11}")
+    try:
+        for size in sizes:
+            workload = Workload(size, args.latency, args.bandwidth)
+            for name in scenarios:
+                try:
+                    seconds, calls, transferred = run_scenario(name, workload, args.ops, server)
+                except ImportError as e:
+                    print(f"{size:>9} {name:<9} skipped: {e}")
+                    continue
+                print(f"{size:>9} {name:<9} {seconds * 1000:>10.2f} {calls:>9.2f} {transferred / 1024:>11.1f}")
+    finally:
+        server.stop()
+        use_storage("bookings", None)
+        use_storage("users", None)
+        use_storage("id_leases", None)
+        reset_booking_cache()
+        reset_user_index()
+        reset_id_allocator()
+        reset_login_guard()
+        reset_geocode_cache()
+        reset_http_client()
+        reset_route_cache()
+        reset_history_store()
+
+if __name__ == "__main__":
+    main()
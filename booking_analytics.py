@@ -0,0 +1,154 @@
+import numpy as np
+from booking_queue_database import BookingDatabase
+
+# Trip, spend and cancellation figures computed over the booking columns held as NumPy arrays.
+# Only the columns below are read from the sheet; fares and distances become float arrays and
+# client, vehicle and status become integer codes into a small table of labels.
+
+ANALYTICS_HEADERS = ["Client ID", "Vehicle Type", "Distance (km)", "Fare (₱)", "Status", "Pickup Time", "Last Updated"]
+CANCELLED = "Cancelled"
+DATE_BUCKETS = {"day": "datetime64[D]", "week": "datetime64[W]", "month": "datetime64[M]"}
+
+NOT_A_DAY = np.datetime64("NaT", "D").astype(np.int64)
+
+def to_floats(texts):
+    """Parse numeric cell text into a float array; blanks and anything unreadable become NaN"""
+    try:
+        return np.fromiter((float(text) if text != "" else np.nan for text in texts), np.float64, len(texts))
+    except (TypeError, ValueError):
+        parsed = np.empty(len(texts), dtype=np.float64)
+        for position, text in enumerate(texts):
+            try:
+                parsed[position] = float(str(text).replace(",", "").replace("₱", ""))
+            except ValueError:
+                parsed[position] = np.nan
+        return parsed
+
+def to_codes(texts):
+    """Categorical encoding: (integer code per row, sorted label per code)"""
+    positions = {}
+    codes = np.fromiter((positions.setdefault(str(text), len(positions)) for text in texts), np.int32, len(texts))
+    labels = np.array(list(positions), dtype=str)
+    order = np.argsort(labels)
+    rank = np.empty(len(order), dtype=np.int32)
+    rank[order] = np.arange(len(order), dtype=np.int32)
+    return rank[codes], labels[order]
+
+def to_days(texts):
+    """Parse the date part of 'YYYY-MM-DD ...' text into datetime64[D]; anything else becomes NaT"""
+    # Bookings share a handful of dates, so each distinct date is parsed once
+    parsed = {}
+
+    def day(text):
+        key = str(text)[:10]
+        value = parsed.get(key)
+        if value is None:
+            try:
+                value = np.datetime64(key, "D").astype(np.int64) if len(key) == 10 and key[4] == key[7] == "-" else NOT_A_DAY
+            except ValueError:
+                value = NOT_A_DAY
+            parsed[key] = value
+        return value
+
+    return np.fromiter(map(day, texts), np.int64, len(texts)).view("datetime64[D]")
+
+class BookingAnalytics:
+    def __init__(self, columns):
+        """columns: {header: [cell text per booking]} for every header in ANALYTICS_HEADERS"""
+        self.fares = to_floats(columns["Fare (₱)"])
+        self.distances = to_floats(columns["Distance (km)"])
+        self.client_codes, self.client_labels = to_codes(columns["Client ID"])
+        self.vehicle_codes, self.vehicle_labels = to_codes(columns["Vehicle Type"])
+        self.status_codes, self.status_labels = to_codes(columns["Status"])
+
+        # A booking's day is its pickup date; scheduled rides only store a time, so use the day it was last updated
+        pickup_days = to_days(columns["Pickup Time"])
+        self.days = np.where(np.isnat(pickup_days), to_days(columns["Last Updated"]), pickup_days)
+
+        cancelled_code = np.flatnonzero(self.status_labels == CANCELLED)
+        self.cancelled = self.status_codes == cancelled_code[0] if len(cancelled_code) else np.zeros(len(self.fares), dtype=bool)
+
+    @classmethod
+    def load(cls, database=None):
+        """Read just the analytics columns from the booking sheet (or the warm cache)"""
+        database = database or BookingDatabase()
+        return cls(database.get_columns(ANALYTICS_HEADERS))
+
+    def __len__(self):
+        return len(self.fares)
+
+    def client_mask(self, client_id):
+        """Boolean mask of one client's bookings"""
+        found = np.flatnonzero(self.client_labels == str(client_id))
+        if not len(found):
+            return np.zeros(len(self), dtype=bool)
+        return self.client_codes == found[0]
+
+    def __selection(self, client_id, mask):
+        selected = np.ones(len(self), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        if client_id is not None:
+            selected = selected & self.client_mask(client_id)
+        return selected
+
+    def totals(self, client_id=None, mask=None):
+        """Bookings, trips (not cancelled), spend, distance, average fare and cancellation rate"""
+        selected = self.__selection(client_id, mask)
+        trips = selected & ~self.cancelled
+        bookings = int(selected.sum())
+        trip_count = int(trips.sum())
+        spend = float(np.nansum(self.fares[trips]))
+        return {
+            "bookings": bookings,
+            "trips": trip_count,
+            "spend": spend,
+            "distance": float(np.nansum(self.distances[trips])),
+            "average_fare": spend / trip_count if trip_count else 0.0,
+            "cancellation_rate": float((selected & self.cancelled).sum()) / bookings if bookings else 0.0
+        }
+
+    def __group(self, codes, labels, selected):
+        """The totals() figures for every group, computed with one bincount per figure"""
+        group_count = len(labels)
+        selected_codes = codes[selected]
+        trips = ~self.cancelled[selected]
+
+        bookings = np.bincount(selected_codes, minlength=group_count)
+        trip_counts = np.bincount(selected_codes, weights=trips, minlength=group_count)
+        spend = np.bincount(selected_codes, weights=np.where(trips, np.nan_to_num(self.fares[selected]), 0.0), minlength=group_count)
+        distance = np.bincount(selected_codes, weights=np.where(trips, np.nan_to_num(self.distances[selected]), 0.0), minlength=group_count)
+        cancelled = bookings - trip_counts
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            average_fare = np.where(trip_counts > 0, spend / trip_counts, 0.0)
+            cancellation_rate = np.where(bookings > 0, cancelled / bookings, 0.0)
+
+        return [
+            {
+                "group": str(labels[code]),
+                "bookings": int(bookings[code]),
+                "trips": int(trip_counts[code]),
+                "spend": float(spend[code]),
+                "distance": float(distance[code]),
+                "average_fare": float(average_fare[code]),
+                "cancellation_rate": float(cancellation_rate[code])
+            }
+            for code in range(group_count) if bookings[code]
+        ]
+
+    def by_vehicle(self, client_id=None, mask=None):
+        return self.__group(self.vehicle_codes, self.vehicle_labels, self.__selection(client_id, mask))
+
+    def by_status(self, client_id=None, mask=None):
+        return self.__group(self.status_codes, self.status_labels, self.__selection(client_id, mask))
+
+    def by_date(self, bucket="day", client_id=None, mask=None):
+        """Group by day, week (starting Thursday, as NumPy counts weeks) or month; undated bookings are left out"""
+        selected = self.__selection(client_id, mask) & ~np.isnat(self.days)
+        if not selected.any():
+            return []
+        # Buckets are consecutive integers, so the offset from the first one is already a group code
+        buckets = self.days.astype(DATE_BUCKETS[bucket]).astype(np.int64)
+        first = buckets[selected].min()
+        codes = np.where(selected, buckets - first, 0)
+        labels = (np.arange(codes.max() + 1) + first).astype(DATE_BUCKETS[bucket]).astype(str)
+        return self.__group(codes, labels, selected)
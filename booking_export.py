@@ -0,0 +1,82 @@
+import csv
+import os
+from booking_queue_database import BookingDatabase, BOOKING_HEADERS
+
+# Parquet output is optional; CSV needs nothing beyond the standard library
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Streams bookings from the sheet to a CSV or Parquet file one chunk at a time, so an export of the
+# whole sheet holds no more than chunk_size rows in memory.
+
+EXPORT_FORMATS = ("csv", "parquet")
+STATUS_COLUMN = BOOKING_HEADERS.index("Status")
+DATE_COLUMNS = [BOOKING_HEADERS.index("Pickup Time"), BOOKING_HEADERS.index("Last Updated")]
+
+def booking_day(row):
+    """The day (YYYY-MM-DD) a booking belongs to: its pickup date, or the day it was last updated"""
+    for column in DATE_COLUMNS:
+        value = str(row[column]) if column < len(row) else ""
+        if len(value) >= 10 and value[4] == "-" and value[7] == "-":
+            return value[:10]
+    return ""
+
+def export_format(path, format=None):
+    """The export format asked for, or the one implied by the file extension"""
+    format = (format or os.path.splitext(path)[1].lstrip(".") or "csv").lower()
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {format}")
+    return format
+
+def iter_export_rows(database=None, client_id=None, status=None, date_from=None, date_to=None, chunk_size=1000):
+    """Yield chunks of booking rows (padded to BOOKING_HEADERS) that pass the filters"""
+    database = database or BookingDatabase()
+    for chunk in database.iter_booking_rows(chunk_size=chunk_size, client_id=client_id):
+        rows = []
+        for row in chunk:
+            row = [str(value) for value in row[:len(BOOKING_HEADERS)]]
+            row += [""] * (len(BOOKING_HEADERS) - len(row))
+            if status and row[STATUS_COLUMN] != status:
+                continue
+            if date_from or date_to:
+                day = booking_day(row)
+                if not day or (date_from and day < date_from) or (date_to and day > date_to):
+                    continue
+            rows.append(row)
+        if rows:
+            yield rows
+
+def export_bookings(path, format=None, database=None, client_id=None, status=None, date_from=None, date_to=None, chunk_size=1000):
+    """Write matching bookings to path as CSV or Parquet and return how many were written"""
+    format = export_format(path, format)
+    chunks = iter_export_rows(database, client_id, status, date_from, date_to, chunk_size)
+    if format == "csv":
+        return _write_csv(path, chunks)
+    return _write_parquet(path, chunks)
+
+def _write_csv(path, chunks):
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(BOOKING_HEADERS)
+        for rows in chunks:
+            writer.writerows(rows)
+            written += len(rows)
+    return written
+
+def _write_parquet(path, chunks):
+    if pq is None:
+        raise RuntimeError("Parquet export needs the pyarrow package (pip install pyarrow)")
+    # Cells are kept as text, exactly as they appear in the sheet; each chunk becomes one row group
+    schema = pa.schema([(header, pa.string()) for header in BOOKING_HEADERS])
+    written = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in chunks:
+            columns = [pa.array([row[position] for row in rows], type=pa.string()) for position in range(len(BOOKING_HEADERS))]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+            written += len(rows)
+    return written
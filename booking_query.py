@@ -0,0 +1,111 @@
+from gspread.utils import rowcol_to_a1
+
+# The Sheets API takes every range of a batch_get in the URL, so very scattered reads are split up
+MAX_RANGES_PER_REQUEST = 400
+
+def column_letter(number):
+    """Column number to its A1 letter(s), e.g. 14 -> 'N'"""
+    return rowcol_to_a1(1, number)[:-1]
+
+def row_spans(row_numbers):
+    """Group row numbers into [first, last] runs of neighbouring rows"""
+    spans = []
+    for row_number in sorted(set(row_numbers)):
+        if spans and row_number == spans[-1][1] + 1:
+            spans[-1][1] = row_number
+        else:
+            spans.append([row_number, row_number])
+    return spans
+
+def matches_condition(value, condition):
+    """Whether cell text satisfies a filter: an exact value, or a predicate taking the text"""
+    if callable(condition):
+        return condition(value)
+    return value == str(condition)
+
+# Reads only the columns and rows an operation needs from the booking worksheet. Filters are answered
+# from the filter columns alone; full rows are then read for just the matching row numbers.
+class BookingQuery:
+    def __init__(self, sheet, column_number, last_column):
+        self.__sheet = sheet
+        self.__column_number = column_number  # Header -> 1-based column number
+        self.__last_letter = column_letter(last_column)
+
+    def __batch_get(self, ranges):
+        results = []
+        for start in range(0, len(ranges), MAX_RANGES_PER_REQUEST):
+            results.extend(self.__sheet.batch_get(ranges[start:start + MAX_RANGES_PER_REQUEST]))
+        return results
+
+    def columns(self, headers, first_row=2, last_row=None):
+        """Read whole columns with one request: {header: [value per row from first_row]}"""
+        end = "" if last_row is None else str(last_row)
+        letters = [column_letter(self.__column_number(header)) for header in headers]
+        results = self.__batch_get([f"{letter}{first_row}:{letter}{end}" for letter in letters])
+        return {
+            header: [str(cell[0]) if cell else "" for cell in values]
+            for header, values in zip(headers, results)
+        }
+
+    def cells(self, row_numbers, headers):
+        """Read a few columns of the given rows with one request: {row_number: [value per header]}"""
+        if not row_numbers:
+            return {}
+        letters = [column_letter(self.__column_number(header)) for header in headers]
+        spans = row_spans(row_numbers)
+
+        results = iter(self.__batch_get([f"{letter}{first}:{letter}{last}" for first, last in spans for letter in letters]))
+        cells = {}
+        for first, last in spans:
+            for position in range(len(letters)):
+                values = next(results)
+                for offset in range(last - first + 1):
+                    value = values[offset][0] if offset < len(values) and values[offset] else ""
+                    cells.setdefault(first + offset, [""] * len(letters))[position] = str(value)
+        return cells
+
+    def rows(self, row_numbers):
+        """Read whole rows with one request, merging neighbouring rows into a single range"""
+        if not row_numbers:
+            return {}
+        spans = row_spans(row_numbers)
+
+        results = self.__batch_get([f"A{first}:{self.__last_letter}{last}" for first, last in spans])
+        rows = {}
+        for (first, last), values in zip(spans, results):
+            for offset in range(last - first + 1):
+                rows[first + offset] = list(values[offset]) if offset < len(values) else []
+        return rows
+
+    def select(self, conditions, headers=None):
+        """Rows matching every condition ({header: value, or a predicate taking the cell text}).
+
+        Returns [(row_number, values)] in sheet order, where values is the whole row,
+        or only the given headers when headers is set.
+        """
+        filter_columns = self.columns(list(conditions))
+        row_count = max((len(values) for values in filter_columns.values()), default=0)
+        matches = []
+        for offset in range(row_count):
+            if all(
+                matches_condition(filter_columns[header][offset] if offset < len(filter_columns[header]) else "", condition)
+                for header, condition in conditions.items()
+            ):
+                matches.append(offset + 2)
+
+        # Matches spread too thin to fetch range by range are cheaper to read as whole columns (or rows)
+        scattered = len(row_spans(matches)) * len(headers or [None]) > MAX_RANGES_PER_REQUEST
+        if headers is None:
+            fetched = self.rows(range(2, row_count + 2) if scattered else matches)
+        elif scattered:
+            projected = self.columns(headers)
+            fetched = {
+                row_number: [
+                    projected[header][row_number - 2] if row_number - 2 < len(projected[header]) else ""
+                    for header in headers
+                ]
+                for row_number in matches
+            }
+        else:
+            fetched = self.cells(matches, headers)
+        return [(row_number, fetched[row_number]) for row_number in matches]
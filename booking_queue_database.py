@@ -1,148 +1,776 @@
-import gspread
-from google.oauth2.service_account import Credentials
+import threading
+import time
+from collections import OrderedDict
+from gspread.utils import numericise_all, rowcol_to_a1
 from datetime import datetime
+from storage_backends import appended_row_number, open_storage
+from booking_query import BookingQuery, matches_condition
+import settings
+
+BOOKING_HEADERS = [
+    "Booking ID", "Client ID", "Client Name", "Pickup Location", "Destination", "Vehicle Type",
+    "Driver Name", "Distance (km)", "Fare (₱)", "Booking Type",
+    "Pickup Time", "Dropoff Time", "Status", "Last Updated"
+]
+
+# Keeps track of which sheet row holds which booking so lookups don't need the whole sheet
+class BookingIndex:
+    def __init__(self):
+        self.rows_by_booking = {}
+        self.rows_by_client = {}
+        self.values_by_row = {}  # Last values we read or wrote for a row
+        self.last_row = 1  # Row 1 holds the headers
+        self.loaded = False
+
+    def clear(self):
+        self.rows_by_booking.clear()
+        self.rows_by_client.clear()
+        self.values_by_row.clear()
+        self.last_row = 1
+        self.loaded = False
+
+    def add(self, row_number, booking_id, client_id):
+        """Record a booking that lives at row_number"""
+        booking_id = str(booking_id)
+        client_id = str(client_id)
+        if booking_id:
+            self.rows_by_booking[booking_id] = row_number
+        if client_id:
+            rows = self.rows_by_client.setdefault(client_id, [])
+            if row_number not in rows:
+                rows.append(row_number)
+        self.last_row = max(self.last_row, row_number)
+
+    def add_columns(self, first_row, booking_ids, client_ids):
+        """Index a block of rows read from the Booking ID and Client ID columns"""
+        count = max(len(booking_ids), len(client_ids))
+        for offset in range(count):
+            booking_id = booking_ids[offset][0] if offset < len(booking_ids) and booking_ids[offset] else ""
+            client_id = client_ids[offset][0] if offset < len(client_ids) and client_ids[offset] else ""
+            self.add(first_row + offset, booking_id, client_id)
+        self.last_row = max(self.last_row, first_row + count - 1)
+
+    def remove_booking_row(self, booking_id, row_number):
+        """Forget where a booking lives if the index still places it at row_number"""
+        if self.rows_by_booking.get(str(booking_id)) == row_number:
+            del self.rows_by_booking[str(booking_id)]
+
+    def remove_client_row(self, client_id, row_number):
+        """Drop a row from a client's list after the booking moved to another client"""
+        rows = self.rows_by_client.get(str(client_id), [])
+        if row_number in rows:
+            rows.remove(row_number)
+
+    def row_for(self, booking_id):
+        return self.rows_by_booking.get(str(booking_id))
+
+    def rows_for_client(self, client_id):
+        return list(self.rows_by_client.get(str(client_id), []))
+
+# Read-through cache of the booking table, shared by every BookingDatabase in the process
+class BookingCache:
+    def __init__(self, ttl=None, max_clients=None):
+        self.lock = threading.RLock()  # Held for every read or write that touches the cache
+        self.index = BookingIndex()
+        self.columns = None  # Header name -> column number, read once per table
+        self.ttl = settings.BOOKING_CACHE_TTL if ttl is None else ttl
+        self.max_clients = settings.BOOKING_CACHE_MAX_CLIENTS if max_clients is None else max_clients
+        self.complete = False  # True once index.values_by_row holds every row of the table
+        self.fingerprint = None  # Change token of the table when the cache was last known to match it
+        self.checked_at = 0.0
+        self.records = None  # Every booking as a record, rebuilt from memory after a write
+        self.synced_rows = 1  # Rows 2..synced_rows are all in the cache
+        self.__client_slices = OrderedDict()  # Client ID -> records, least recently used first
+
+    def is_fresh(self):
+        return self.complete and time.monotonic() - self.checked_at < self.ttl
+
+    def mark_checked(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.checked_at = time.monotonic()
+
+    def invalidate(self):
+        """Forget that every row is cached; the next full read goes back to the table"""
+        self.complete = False
+        self.records = None
+        self.synced_rows = 1
+        self.__client_slices.clear()
+
+    def client_slice(self, client_id):
+        records = self.__client_slices.get(str(client_id))
+        if records is not None:
+            self.__client_slices.move_to_end(str(client_id))
+        return records
+
+    def store_client_slice(self, client_id, records):
+        self.__client_slices[str(client_id)] = records
+        self.__client_slices.move_to_end(str(client_id))
+        while len(self.__client_slices) > self.max_clients:
+            self.__client_slices.popitem(last=False)
+
+    def written(self, client_ids):
+        """Drop what our own write made out of date; the rows themselves are updated in place"""
+        self.records = None
+        for client_id in client_ids:
+            self.__client_slices.pop(str(client_id), None)
+
+_booking_cache = None
+_booking_cache_lock = threading.Lock()
+
+def get_booking_cache():
+    """The process-wide booking cache"""
+    global _booking_cache
+    with _booking_cache_lock:
+        if _booking_cache is None:
+            _booking_cache = BookingCache()
+        return _booking_cache
+
+def reset_booking_cache():
+    """Forget every cached booking and header, e.g. after switching storage backends"""
+    global _booking_cache
+    with _booking_cache_lock:
+        _booking_cache = None
 
 class BookingDatabase:
     def __init__(self):
-        # Spreadsheet details (made private)
-        self.__sheet_id = "1i3lWKS-o8VjeGykXbRP27MZS0xniY490DAibQgNMwoE"
-        # Google Sheets API setup (made private)
-        self.__scopes = ['https://www.googleapis.com/auth/spreadsheets']
-        self.__creds = Credentials.from_service_account_file('credentials.json', scopes=self.__scopes)
-        self.__client = gspread.authorize(self.__creds)
-        self.__sheet = self.__client.open_by_key(self.__sheet_id).sheet1
-        
-        # Initialize headers if sheet is empty
-        if not self.__get_sheet().get_all_records():
-            self._initialize_headers()
+        # Nothing is opened or read until the first real lookup or write
+        self.__sheet = None
+        self.__cache = get_booking_cache()
+        self.__index = self.__cache.index
 
     # Made sheet id private in accordance with OOP
     def __get_sheet(self):
-        """Private method to access the sheet with proper encapsulation"""
+        """Private method to access the sheet with proper encapsulation, connecting on first use"""
+        if self.__sheet is None:
+            # Booking table on the configured backend (Sheets, SQLite or in-memory)
+            self.__sheet = open_storage("bookings")
+            # Make sure the headers exist before anything is appended
+            self.__column_map()
         return self.__sheet
 
     # Create column headers in the sheet
     def _initialize_headers(self):
-        headers = [
-            "Booking ID", "Client ID", "Client Name", "Pickup Location", "Destination", "Vehicle Type",
-            "Driver Name", "Distance (km)", "Fare (₱)", "Booking Type",
-            "Pickup Time", "Dropoff Time", "Status", "Last Updated"
+        self.__sheet.update([BOOKING_HEADERS], f"A1:{rowcol_to_a1(1, len(BOOKING_HEADERS))}")
+        self.__index.clear()
+        self.__cache.invalidate()
+        self.__cache.columns = None
+
+    # Header positions only change with the schema, so the header row is read once per process and reused
+    def __column_map(self):
+        """Return the cached {header: column number} map, writing the headers if the sheet is empty"""
+        with self.__cache.lock:
+            if self.__cache.columns is None:
+                # A single-row read tells us whether the headers exist
+                header_row = self.__sheet.row_values(1)
+                if not header_row:
+                    self._initialize_headers()
+                    header_row = BOOKING_HEADERS
+                self.__cache.columns = {
+                    header: number for number, header in enumerate(header_row, start=1) if header
+                }
+            return self.__cache.columns
+
+    def __column_number(self, header):
+        self.__get_sheet()
+        columns = self.__column_map()
+        if header not in columns:
+            # The sheet layout changed underneath us, so read the headers again
+            self.__cache.columns = None
+            columns = self.__column_map()
+        return columns[header]
+
+    # Reads only the Booking ID and Client ID columns to (re)build the row index
+    def __load_index(self):
+        """Build the index from scratch with a single two-column read"""
+        self.__index.clear()
+        self.__cache.invalidate()
+        booking_ids, client_ids = self.__get_sheet().batch_get(["A2:A", "B2:B"])
+        self.__index.add_columns(2, booking_ids, client_ids)
+        self.__index.loaded = True
+
+    def __refresh_index(self):
+        """Pick up rows appended since the index was last read (e.g. by other clients)"""
+        if not self.__index.loaded:
+            self.__load_index()
+            return
+        first_row = self.__index.last_row + 1
+        booking_ids, client_ids = self.__get_sheet().batch_get([f"A{first_row}:A", f"B{first_row}:B"])
+        # Rows found here are only known by ID; the next sync reads their values
+        self.__index.add_columns(first_row, booking_ids, client_ids)
+
+    # Finds the sheet row for a booking, only touching the sheet when the index misses
+    def __find_row(self, booking_id):
+        if not self.__index.loaded:
+            self.__load_index()
+            return self.__index.row_for(booking_id)
+        row_number = self.__index.row_for(booking_id)
+        if row_number is None:
+            self.__refresh_index()
+            row_number = self.__index.row_for(booking_id)
+        if row_number is None:
+            # After rows are deleted outside the app, appends land inside the indexed range where a refresh
+            # doesn't look, so rebuild the index once before giving up
+            self.__load_index()
+            row_number = self.__index.row_for(booking_id)
+        return row_number
+
+    # Reads a single row and checks it still belongs to the booking we expect
+    def __read_booking_row(self, booking_id):
+        """Return (row_number, values) for a booking, rebuilding the index if rows moved"""
+        row_number = self.__find_row(booking_id)
+        if row_number is None:
+            return None, None
+        values = self.__get_sheet().row_values(row_number)
+        if values and str(values[0]) == str(booking_id):
+            self.__index.values_by_row[row_number] = values
+            return row_number, values
+
+        # Rows were moved or deleted outside the app, so the index is stale
+        self.__load_index()
+        row_number = self.__index.row_for(booking_id)
+        if row_number is None:
+            return None, None
+        values = self.__get_sheet().row_values(row_number)
+        if values and str(values[0]) == str(booking_id):
+            self.__index.values_by_row[row_number] = values
+            return row_number, values
+        return None, None
+
+    # Confirms the row the index points at still holds the booking before anything is written to it
+    def __confirmed_row(self, booking_id):
+        """Row number of a booking, checked against the cached row while the cache is fresh and its Booking ID cell otherwise"""
+        row_number = self.__find_row(booking_id)
+        if row_number is None:
+            return None
+        cached = self.__index.values_by_row.get(row_number)
+        if self.__cache.is_fresh() and cached:
+            if str(cached[0]) == str(booking_id):
+                return row_number
+        else:
+            found = self.__get_sheet().get(f"A{row_number}")
+            if found and found[0] and str(found[0][0]) == str(booking_id):
+                return row_number
+
+        # Rows were moved or deleted outside the app, so the index is stale
+        self.__load_index()
+        return self.__index.row_for(booking_id)
+
+    def __query(self):
+        """Column-projected reads over the booking sheet"""
+        sheet = self.__get_sheet()
+        return BookingQuery(sheet, self.__column_number, max(self.__column_map().values()))
+
+    @staticmethod
+    def __belongs(values, client_id):
+        """Whether a row read by number still holds one of this client's bookings"""
+        return len(values) > 1 and str(values[1]) == str(client_id)
+
+    # Reads one client's rows through the Client ID index instead of scanning the whole table
+    def __read_client_rows(self, client_id):
+        """Return the raw rows of a client's bookings in sheet order"""
+        self.__refresh_index()
+        rows = self.__query().rows(self.__index.rows_for_client(client_id))
+        if not all(self.__belongs(values, client_id) for values in rows.values()):
+            # Rows were moved or deleted outside the app, so the index is stale
+            self.__load_index()
+            rows = self.__query().rows(self.__index.rows_for_client(client_id))
+
+        matching = []
+        for row_number in sorted(rows):
+            if self.__belongs(rows[row_number], client_id):
+                self.__index.values_by_row[row_number] = rows[row_number]
+                matching.append(rows[row_number])
+        return matching
+
+    def __note_own_write(self, client_ids):
+        # Our own writes are already applied to the cached rows, so only derived lists go stale
+        self.__cache.written(client_ids)
+
+    def __store_row(self, row_number, values):
+        """Put a freshly read row into the cache and the index"""
+        old_values = self.__index.values_by_row.get(row_number, [])
+        old_booking_id = old_values[0] if old_values else ""
+        old_client_id = old_values[1] if len(old_values) > 1 else ""
+        booking_id = values[0] if values else ""
+        client_id = values[1] if len(values) > 1 else ""
+        if old_booking_id and str(old_booking_id) != str(booking_id):
+            self.__index.remove_booking_row(old_booking_id, row_number)
+        if old_client_id and str(old_client_id) != str(client_id):
+            self.__index.remove_client_row(old_client_id, row_number)
+        self.__index.add(row_number, booking_id, client_id)
+        self.__index.values_by_row[row_number] = list(values)
+        self.__cache.written([old_client_id, client_id])
+
+    # Loads every row into the cache, unless the cached copy is still current
+    def __ensure_all_rows(self):
+        if self.__cache.is_fresh():
+            return
+        # The change token is read before any rows, so a write landing mid-read still counts as a change next time
+        revision = self.__get_sheet().revision()
+        if self.__cache.complete:
+            if revision is not None and revision == self.__cache.fingerprint:
+                # Nothing changed since the last sync, so trust the cache for another TTL
+                self.__cache.mark_checked(revision)
+                return
+            if self.__sync_changes(revision):
+                return
+        self.__load_all_rows(revision)
+
+    def __load_all_rows(self, revision):
+        """Replace the cache with a full read of the table"""
+        rows = self.__get_sheet().get_all_values()
+        self.__index.clear()
+        self.__cache.invalidate()
+        for row_number, values in enumerate(rows[1:], start=2):
+            self.__index.add(row_number, values[0] if values else "", values[1] if len(values) > 1 else "")
+            self.__index.values_by_row[row_number] = list(values)
+        self.__index.loaded = True
+        self.__cache.complete = True
+        self.__cache.synced_rows = max(1, len(rows))
+        self.__cache.mark_checked(revision)
+
+    # Brings a complete cache up to date by reading only what changed: rows appended since the last sync,
+    # and rows whose Last Updated stamp no longer matches the cached copy. Only runs once revision() (the
+    # Drive modifiedTime on Sheets) shows the table was written; an unchanged table costs that one small request.
+    # Booking IDs are compared too, since a batch of rows shares one stamp and a shift can't be seen from stamps.
+    def __sync_changes(self, revision):
+        """Return False when the table changed shape (rows deleted or moved) and needs a full reload"""
+        sheet = self.__get_sheet()
+        stamp_column = self.__column_number("Last Updated")
+        stamp_letter = rowcol_to_a1(1, stamp_column)[:-1]
+        last_letter = rowcol_to_a1(1, max(self.__column_map().values()))[:-1]
+        synced_rows = self.__cache.synced_rows
+
+        # One request for the Booking ID and Last Updated columns and everything past the last synced row
+        booking_ids, stamps, appended = sheet.batch_get(
+            ["A2:A", f"{stamp_letter}2:{stamp_letter}", f"A{synced_rows + 1}:{last_letter}"]
+        )
+        if max(len(booking_ids), len(stamps)) + 1 < synced_rows:
+            return False
+
+        def cell(column, offset):
+            return column[offset][0] if offset < len(column) and column[offset] else ""
+
+        changed_rows = []
+        for row_number in range(2, synced_rows + 1):
+            cached = self.__index.values_by_row.get(row_number, [])
+            cached_id = cached[0] if cached else ""
+            if str(cell(booking_ids, row_number - 2)) != str(cached_id):
+                # A row now holds a different booking, so rows were deleted or moved outside the app
+                return False
+            cached_stamp = cached[stamp_column - 1] if len(cached) >= stamp_column else ""
+            if cell(stamps, row_number - 2) != cached_stamp:
+                changed_rows.append(row_number)
+
+        # A second request only when existing rows were edited
+        if changed_rows:
+            for row_number, values in sorted(self.__query().rows(changed_rows).items()):
+                self.__store_row(row_number, values)
+        for offset, values in enumerate(appended):
+            self.__store_row(synced_rows + 1 + offset, values)
+
+        self.__cache.synced_rows = synced_rows + len(appended)
+        self.__index.loaded = True
+        self.__cache.mark_checked(revision)
+        return True
+
+    def __to_record(self, values):
+        """Turn a raw row into the same dict shape get_all_records() returns"""
+        columns = self.__column_map()
+        headers = sorted(columns, key=columns.get)
+        values = numericise_all(values + [""] * (len(headers) - len(values)))
+        return dict(zip(headers, values))
+
+    def __booking_row(self, booking_data):
+        """Lay out a booking dict in sheet column order"""
+        return [
+            booking_data["id"],
+            booking_data["client_id"],
+            booking_data["client_name"],
+            booking_data["pickup"],
+            booking_data["dropoff"],
+            booking_data["vehicle"],
+            booking_data["driver"]["name"],
+            booking_data["distance"],
+            booking_data["fare"],
+            booking_data["type"],
+            booking_data["pickup_time"],
+            booking_data.get("dropoff_time", "ASAP"),
+            booking_data["status"],
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         ]
-        self.__get_sheet().insert_row(headers, 1)
 
     def add_booking(self, booking_data):
         """Add a new booking to the sheet"""
+        return self.add_bookings([booking_data])
+
+    # Appends several bookings with a single request
+    def add_bookings(self, bookings):
+        """Add a batch of bookings to the sheet in one append_rows call"""
         try:
-            # Prepare data row
-            row_data = [
-                booking_data["id"],
-                booking_data["client_id"],
-                booking_data["client_name"],
-                booking_data["pickup"],
-                booking_data["dropoff"],
-                booking_data["vehicle"],
-                booking_data["driver"]["name"],
-                booking_data["distance"],
-                booking_data["fare"],
-                booking_data["type"],
-                booking_data["pickup_time"],
-                booking_data.get("dropoff_time", "ASAP"),
-                booking_data["status"],
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            ]
+            with self.__cache.lock:
+                # Prepare data rows
+                rows = [self.__booking_row(booking_data) for booking_data in bookings]
+                if not rows:
+                    return True
             
-            # Append to sheet
-            self.__get_sheet().append_row(row_data)
-            return True
+                # Append to sheet
+                response = self.__get_sheet().append_rows(rows)
+
+                # Keep the index in step so the new bookings can be found without a reload
+                if self.__index.loaded:
+                    first_row = appended_row_number(response)
+                    if first_row is not None and first_row == self.__index.last_row + 1:
+                        for offset, (booking_data, row_data) in enumerate(zip(bookings, rows)):
+                            self.__index.add(first_row + offset, booking_data["id"], booking_data["client_id"])
+                            self.__index.values_by_row[first_row + offset] = [str(value) for value in row_data]
+                        if self.__cache.synced_rows == first_row - 1:
+                            self.__cache.synced_rows = first_row + len(rows) - 1
+                    else:
+                        # Rows were deleted (or added) outside the app, so the append landed somewhere the
+                        # index doesn't expect
+                        self.__load_index()
+                self.__note_own_write([booking_data["client_id"] for booking_data in bookings])
+                return True
         except Exception as e:
-            print(f"Error adding booking: {e}")
+            print(f"Error adding bookings: {e}")
             return False
+
+    def has_booking(self, booking_id):
+        """Check whether a booking is on the sheet using the index (raises if the sheet is unreachable)"""
+        with self.__cache.lock:
+            return self.__find_row(booking_id) is not None
         
     # Updates booking status whenever client cancelled
     def update_booking_status(self, booking_id, new_status):
         """Update the status of a booking in the spreadsheet"""
         try:
-            # Get all the column headers
-            header_row = self.__get_sheet().row_values(1)
+            with self.__cache.lock:
+                # Column numbers come from the cached header map
+                status_column_number = self.__column_number("Status")
+                last_updated_column_number = self.__column_number("Last Updated")
             
-            # Find which column numbers we need
-            status_column_number = header_row.index("Status") + 1 
-            last_updated_column_number = header_row.index("Last Updated") + 1
-            booking_id_column_number = header_row.index("Booking ID") + 1
+                # The index knows the row; the fresh cached row or one Booking ID cell confirms it
+                row_number = self.__confirmed_row(booking_id)
+                if row_number is None:
+                    print(f"Couldn't find booking with ID: {booking_id}")
+                    return False
+
+                # Write the status and the last updated time in one request
+                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                self.__get_sheet().batch_update([
+                    {"range": rowcol_to_a1(row_number, status_column_number), "values": [[new_status]]},
+                    {"range": rowcol_to_a1(row_number, last_updated_column_number), "values": [[current_time]]}
+                ])
+
+                # Keep the cached copy of the row in step with what we just wrote
+                cached = self.__index.values_by_row.get(row_number)
+                if cached is not None and cached and str(cached[0]) == str(booking_id):
+                    cached += [""] * (max(status_column_number, last_updated_column_number) - len(cached))
+                    cached[status_column_number - 1] = new_status
+                    cached[last_updated_column_number - 1] = current_time
+                    self.__note_own_write([cached[1]])
+                else:
+                    self.__cache.invalidate()
             
-            # Get all the booking records
-            all_bookings = self.__get_sheet().get_all_records()
-            
-            # Look through each booking to find the right one
-            for row_number, booking in enumerate(all_bookings, start=2):  # Start at row 2
-                # Check if this is the booking we want to update
-                if str(booking["Booking ID"]) == str(booking_id):
-                    # Update the status
-                    self.__get_sheet().update_cell(row_number, status_column_number, new_status)
-                    
-                    # Update the last updated time
-                    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    self.__get_sheet().update_cell(row_number, last_updated_column_number, current_time)
-                    
-                    # Let the user know it worked
-                    return True
-                    
-            # If we get here, we didn't find the booking
-            print(f"Couldn't find booking with ID: {booking_id}")
-            return False
+                # Let the user know it worked
+                return True
             
         except Exception as error:
             print(f"Something went wrong: {error}")
             return False
 
-    # Retrieve all bookings from the sheet
+    # Retrieve all bookings from the sheet (or from the cache when nothing changed)
     def get_all_bookings(self):
         
         try:
-            return self.__get_sheet().get_all_records()
+            with self.__cache.lock:
+                self.__ensure_all_rows()
+                if self.__cache.records is None:
+                    self.__cache.records = [
+                        self.__to_record(values) for _, values in sorted(self.__index.values_by_row.items())
+                    ]
+                return list(self.__cache.records)
         except Exception as e:
             print(f"Error retrieving bookings: {e}")
             return []
 
+    # All bookings made by one client. A fully cached table answers from the per-client slice;
+    # otherwise only the rows the Client ID index points at are read
+    def get_bookings_for_client(self, client_id):
+        try:
+            with self.__cache.lock:
+                if not self.__cache.complete:
+                    return [self.__to_record(values) for values in self.__read_client_rows(client_id)]
+                self.__ensure_all_rows()
+                records = self.__cache.client_slice(client_id)
+                if records is None:
+                    records = [
+                        self.__to_record(self.__index.values_by_row[row_number])
+                        for row_number in sorted(self.__index.rows_for_client(client_id))
+                        if row_number in self.__index.values_by_row
+                    ]
+                    self.__cache.store_client_slice(client_id, records)
+                return list(records)
+        except Exception as e:
+            print(f"Error retrieving bookings for client {client_id}: {e}")
+            return []
+
+    # Same bookings as get_bookings_for_client, but handed over a chunk at a time so a window can show
+    # the first rows while the rest are still being read. The cache lock is only held per chunk.
+    def iter_bookings_for_client(self, client_id, chunk_size=50):
+        """Yield (records, total) for each chunk of a client's bookings, in sheet order"""
+        with self.__cache.lock:
+            if self.__cache.complete:
+                records = self.get_bookings_for_client(client_id)
+                row_numbers = None
+            else:
+                self.__refresh_index()
+                row_numbers = sorted(self.__index.rows_for_client(client_id))
+
+        if row_numbers is None:
+            for start in range(0, len(records), chunk_size):
+                yield records[start:start + chunk_size], len(records)
+            return
+
+        seen = set()
+        stale = False
+        for start in range(0, len(row_numbers), chunk_size):
+            with self.__cache.lock:
+                rows = self.__query().rows(row_numbers[start:start + chunk_size])
+                records = []
+                for row_number in sorted(rows):
+                    if self.__belongs(rows[row_number], client_id):
+                        self.__index.values_by_row[row_number] = rows[row_number]
+                        records.append(self.__to_record(rows[row_number]))
+                        seen.add(str(rows[row_number][0]))
+                    else:
+                        stale = True
+            yield records, len(row_numbers)
+
+        if stale:
+            # Rows moved outside the app while we were reading; pick up whatever we missed
+            with self.__cache.lock:
+                self.__load_index()
+                missed = [
+                    self.__to_record(values) for values in self.__read_client_rows(client_id)
+                    if str(values[0]) not in seen
+                ]
+            if missed:
+                yield missed, len(seen) + len(missed)
+
+    # Every booking row (or one client's), a chunk at a time, for exports that must not hold the whole
+    # sheet in memory. One ranged read per chunk; the cache lock is only held while a chunk is read.
+    def iter_booking_rows(self, chunk_size=1000, client_id=None):
+        """Yield lists of raw rows in sheet order"""
+        with self.__cache.lock:
+            fresh = self.__cache.is_fresh()
+            if client_id is not None:
+                if not fresh:
+                    self.__refresh_index()
+                row_numbers = sorted(self.__index.rows_for_client(client_id))
+            elif fresh:
+                row_numbers = sorted(self.__index.values_by_row)
+            else:
+                row_numbers = None
+                row_count = self.__get_sheet().row_count
+
+        if row_numbers is not None:
+            for start in range(0, len(row_numbers), chunk_size):
+                with self.__cache.lock:
+                    if fresh:
+                        rows = {
+                            row_number: list(self.__index.values_by_row.get(row_number, []))
+                            for row_number in row_numbers[start:start + chunk_size]
+                        }
+                    else:
+                        rows = self.__query().rows(row_numbers[start:start + chunk_size])
+                yield [
+                    rows[row_number] for row_number in sorted(rows)
+                    if rows[row_number] and (client_id is None or self.__belongs(rows[row_number], client_id))
+                ]
+            return
+
+        # Walk the sheet in fixed ranges; past the grid size we only go on while ranges keep coming back full
+        first_row = 2
+        while True:
+            last_row = first_row + chunk_size - 1
+            with self.__cache.lock:
+                rows = self.__query().rows(range(first_row, last_row + 1))
+            chunk = [rows[row_number] for row_number in sorted(rows) if any(str(value) for value in rows[row_number])]
+            if chunk:
+                yield chunk
+            if last_row >= row_count and not rows.get(last_row):
+                return
+            first_row = last_row + 1
+
+    # For callers that keep their own copy of a client's history: only the bookings whose
+    # "Last Updated" stamp is at or after since are read in full
+    def get_client_changes(self, client_id, since=None):
+        """Return (changed records, the client's booking IDs in sheet order), or (None, None) on error"""
+        try:
+            with self.__cache.lock:
+                if not self.__cache.complete:
+                    self.__refresh_index()
+                    row_numbers = sorted(self.__index.rows_for_client(client_id))
+                    cells = self.__query().cells(row_numbers, ["Booking ID", "Client ID", "Last Updated"])
+                    if all(cells.get(row_number, ["", ""])[1] == str(client_id) for row_number in row_numbers):
+                        changed = [
+                            row_number for row_number in row_numbers
+                            if since is None or cells[row_number][2] >= since
+                        ]
+                        records = []
+                        for row_number, values in sorted(self.__query().rows(changed).items()):
+                            self.__index.values_by_row[row_number] = values
+                            records.append(self.__to_record(values))
+                        return records, [cells[row_number][0] for row_number in row_numbers]
+                    # Rows moved outside the app, so fall back to reading the client's rows in full
+                    records = [self.__to_record(values) for values in self.__read_client_rows(client_id)]
+                else:
+                    records = self.get_bookings_for_client(client_id)
+
+                booking_ids = [str(record["Booking ID"]) for record in records]
+                changed = [record for record in records if since is None or str(record["Last Updated"]) >= since]
+                return changed, booking_ids
+        except Exception as e:
+            print(f"Error checking bookings for client {client_id}: {e}")
+            return None, None
+
+    # Bookings matching every condition, e.g. {"Status": "Confirmed"}. Only the filter columns are read
+    # to find them, then just the matching rows (or only the requested headers of them).
+    def find_bookings(self, conditions, headers=None):
+        """Return matching bookings as records; conditions map headers to a value or a predicate on the cell text"""
+        try:
+            with self.__cache.lock:
+                if self.__cache.is_fresh():
+                    columns = self.__column_map()
+
+                    def cell(values, header):
+                        position = columns[header] - 1
+                        return str(values[position]) if position < len(values) else ""
+
+                    matches = [
+                        (row_number, values if headers is None else [cell(values, header) for header in headers])
+                        for row_number, values in sorted(self.__index.values_by_row.items())
+                        if all(matches_condition(cell(values, header), condition) for header, condition in conditions.items())
+                    ]
+                else:
+                    matches = self.__query().select(conditions, headers)
+
+                if headers is None:
+                    for row_number, values in matches:
+                        self.__index.values_by_row[row_number] = values
+                    return [self.__to_record(values) for _, values in matches]
+                return [dict(zip(headers, numericise_all(values))) for _, values in matches]
+        except Exception as e:
+            print(f"Error searching bookings: {e}")
+            return []
+
+    # Every value of one column, e.g. Status for a dashboard, without reading the other 13
+    def get_column(self, header):
+        return numericise_all(self.get_columns([header]).get(header, []))
+
+    # Raw text of a few columns for every booking, read together in one request
+    def get_columns(self, headers):
+        """Return {header: [cell text per booking row]}, all lists the same length"""
+        try:
+            with self.__cache.lock:
+                if self.__cache.is_fresh():
+                    positions = [self.__column_number(header) - 1 for header in headers]
+                    rows = [values for _, values in sorted(self.__index.values_by_row.items())]
+                    return {
+                        header: [str(values[position]) if position < len(values) else "" for values in rows]
+                        for header, position in zip(headers, positions)
+                    }
+                columns = self.__query().columns(headers)
+                length = max((len(values) for values in columns.values()), default=0)
+                return {header: values + [""] * (length - len(values)) for header, values in columns.items()}
+        except Exception as e:
+            print(f"Error reading {', '.join(headers)}: {e}")
+            return {header: [] for header in headers}
+
     # Check if booking exists in sheet
     def get_booking_by_id(self, booking_id):
         try:
-            records = self.__get_sheet().get_all_records()
-            for record in records:
-                if str(record["Booking ID"]) == str(booking_id):
-                    return record
-            return None
+            with self.__cache.lock:
+                # A fresh cache answers straight from memory
+                if self.__cache.is_fresh():
+                    values = self.__index.values_by_row.get(self.__index.row_for(booking_id))
+                    if values and str(values[0]) == str(booking_id):
+                        return self.__to_record(values)
+                _, values = self.__read_booking_row(booking_id)
+                if values is None:
+                    return None
+                return self.__to_record(values)
         except Exception as e:
             print(f"Error finding booking: {e}")
             return None
 
+    @staticmethod
+    def __same_value(old, new):
+        """Sheets hands numbers back as text, so compare 50 and "50" as equal"""
+        if str(old) == str(new):
+            return True
+        try:
+            return float(old) == float(new)
+        except (TypeError, ValueError):
+            return False
+
+    # Groups changed columns into runs so neighbouring cells share one range
+    @staticmethod
+    def __changed_ranges(row_number, old_values, new_values):
+        ranges = []
+        run_start = None
+        for column, new in enumerate(new_values, start=1):
+            old = old_values[column - 1] if column <= len(old_values) else ""
+            changed = not BookingDatabase.__same_value(old, new)
+            if changed and run_start is None:
+                run_start = column
+            if not changed and run_start is not None:
+                ranges.append((run_start, column - 1))
+                run_start = None
+        if run_start is not None:
+            ranges.append((run_start, len(new_values)))
+
+        return [
+            {
+                "range": f"{rowcol_to_a1(row_number, first)}:{rowcol_to_a1(row_number, last)}",
+                "values": [new_values[first - 1:last]]
+            }
+            for first, last in ranges
+        ]
+
     # Updates the sheet for new input bookings
     def update_booking(self, booking_data):
-        """Full booking update"""
+        """Full booking update, written in place and only for the cells that changed"""
         try:
-            records = self.__get_sheet().get_all_records()
-            for idx, record in enumerate(records, start=2):
-                if str(record["Booking ID"]) == str(booking_data["id"]):
-                    row_data = [
-                        booking_data["id"],
-                        booking_data["client_id"], 
-                        booking_data["client_name"], 
-                        booking_data["pickup"],
-                        booking_data["dropoff"],
-                        booking_data["vehicle"],
-                        booking_data["driver"]["name"],
-                        booking_data["distance"],
-                        booking_data["fare"],
-                        booking_data["type"],
-                        booking_data["pickup_time"],
-                        booking_data.get("dropoff_time", "ASAP"),
-                        booking_data["status"],
-                        datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    ]
-                    self.__get_sheet().delete_rows(idx)
-                    self.__get_sheet().insert_row(row_data, idx)
-                    return True
-            return False
+            with self.__cache.lock:
+                # Diff against the cached row while the cache is fresh; otherwise read the row, which
+                # also confirms it still holds this booking before anything is written to it
+                idx, old_values = None, None
+                if self.__cache.is_fresh():
+                    idx = self.__find_row(booking_data["id"])
+                    old_values = self.__index.values_by_row.get(idx)
+                    if not old_values or str(old_values[0]) != str(booking_data["id"]):
+                        old_values = None
+                if old_values is None:
+                    idx, old_values = self.__read_booking_row(booking_data["id"])
+                if idx is None:
+                    return False
+
+                row_data = self.__booking_row(booking_data)
+                changes = self.__changed_ranges(idx, old_values, row_data)
+                if changes:
+                    self.__get_sheet().batch_update(changes)
+
+                # Move the row to the new client's list if the booking changed hands
+                old_client_id = old_values[1] if len(old_values) > 1 else ""
+                if str(old_client_id) != str(booking_data["client_id"]):
+                    self.__index.remove_client_row(old_client_id, idx)
+                self.__index.add(idx, booking_data["id"], booking_data["client_id"])
+                self.__index.values_by_row[idx] = [str(value) for value in row_data]
+                self.__note_own_write([old_client_id, booking_data["client_id"]])
+                return True
         except Exception as e:
             print(f"Error updating booking: {e}")
             return False
\ No newline at end of file
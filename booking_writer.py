@@ -0,0 +1,219 @@
+import json
+import queue
+import random
+import sqlite3
+import threading
+import time
+from booking_queue_database import BookingDatabase
+from tk_pump import pump_on_tk
+import settings
+
+# Uploads bookings to the sheet in the background so confirming a booking never waits on the network.
+# Bookings are written to a local SQLite spool first, so they survive a crash or an offline period.
+class BookingWriter:
+    def __init__(self, database=None, spool_path=None, batch_size=None, base_delay=None, max_delay=None):
+        self.__database = database
+        self.__spool_path = spool_path or settings.BOOKING_SPOOL_PATH
+        self.__batch_size = batch_size or settings.BOOKING_SPOOL_BATCH_SIZE
+        self.__base_delay = settings.BOOKING_SPOOL_BASE_DELAY if base_delay is None else base_delay
+        self.__max_delay = settings.BOOKING_SPOOL_MAX_DELAY if max_delay is None else max_delay
+
+        self.__lock = threading.Lock()
+        self.__wake = threading.Event()
+        self.__callbacks = {}  # Booking ID -> callback waiting for the upload result
+        self.__completions = queue.Queue()  # Results waiting to be handed back to the Tk thread
+        self.__tk_root = None
+        self.__thread = None
+
+        self.__create_spool()
+
+    def __connect(self):
+        return sqlite3.connect(self.__spool_path, timeout=10)
+
+    def __create_spool(self):
+        with self.__lock, self.__connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS pending_bookings ("
+                " booking_id TEXT PRIMARY KEY,"
+                " payload TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " queued_at REAL NOT NULL)"
+            )
+            # Leftovers from a previous run may have reached the sheet before the app stopped,
+            # so count them as retries and they'll be checked before being appended again
+            connection.execute("UPDATE pending_bookings SET attempts = attempts + 1")
+
+    def __get_database(self):
+        # Connecting is slow, so it happens on the writer thread rather than the caller's
+        if self.__database is None:
+            self.__database = BookingDatabase()
+        return self.__database
+
+    def start(self):
+        """Start the background upload thread (safe to call more than once)"""
+        if self.__thread is None or not self.__thread.is_alive():
+            self.__thread = threading.Thread(target=self.__run, name="booking-writer", daemon=True)
+            self.__thread.start()
+        # Anything left in the spool from a previous run gets picked up straight away
+        self.__wake.set()
+
+    # Queues a booking for upload and returns immediately
+    def submit(self, booking, callback=None):
+        """Save the booking to the spool; callback(booking_id, saved, error) runs on the Tk thread"""
+        booking_id = str(booking["id"])
+        with self.__lock, self.__connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO pending_bookings (booking_id, payload, attempts, queued_at) VALUES (?, ?, 0, ?)",
+                (booking_id, json.dumps(booking), time.time())
+            )
+            if callback is not None:
+                self.__callbacks[booking_id] = callback
+        self.start()
+
+    def update_pending_status(self, booking_id, new_status):
+        """Change the status of a booking that hasn't been uploaded yet; False if it already was"""
+        booking_id = str(booking_id)
+        with self.__lock, self.__connect() as connection:
+            row = connection.execute(
+                "SELECT payload FROM pending_bookings WHERE booking_id = ?", (booking_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            booking = json.loads(row[0])
+            booking["status"] = new_status
+            connection.execute(
+                "UPDATE pending_bookings SET payload = ? WHERE booking_id = ?",
+                (json.dumps(booking), booking_id)
+            )
+            return True
+
+    def pending_count(self):
+        with self.__lock, self.__connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM pending_bookings").fetchone()[0]
+
+    # Tk widgets may only be touched from the main thread, so results are pumped through root.after
+    def bind_to_tk(self, root, interval_ms=200):
+        """Deliver upload results to callbacks from the Tk event loop of root"""
+        if self.__tk_root is root:
+            return
+        self.__tk_root = root
+
+        def step():
+            if self.__tk_root is not root:
+                return False
+            self.dispatch_completions()
+
+        pump_on_tk(root, step, interval_ms, on_closed=self.__unbind_tk)
+
+    def __unbind_tk(self):
+        self.__tk_root = None
+
+    def dispatch_completions(self):
+        """Run the callbacks for every finished upload on the calling thread"""
+        while True:
+            try:
+                callback, booking_id, saved, error = self.__completions.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                callback(booking_id, saved, error)
+            except Exception as e:
+                print(f"Booking callback error: {e}")
+
+    def __notify(self, booking_id, saved, error=None, keep_callback=False):
+        with self.__lock:
+            if keep_callback:
+                callback = self.__callbacks.get(booking_id)
+            else:
+                callback = self.__callbacks.pop(booking_id, None)
+        if callback is not None:
+            self.__completions.put((callback, booking_id, saved, error))
+
+    def __next_batch(self):
+        with self.__lock, self.__connect() as connection:
+            return connection.execute(
+                "SELECT booking_id, payload, attempts FROM pending_bookings ORDER BY queued_at LIMIT ?",
+                (self.__batch_size,)
+            ).fetchall()
+
+    def __retry_delay(self, attempts):
+        """Exponential backoff with jitter so many clients don't retry in lockstep"""
+        delay = min(self.__max_delay, self.__base_delay * (2 ** attempts))
+        return delay * random.uniform(0.5, 1.0)
+
+    def __run(self):
+        attempts = 0
+        while True:
+            self.__wake.wait()
+            self.__wake.clear()
+
+            while True:
+                batch = self.__next_batch()
+                if not batch:
+                    attempts = 0
+                    break
+
+                booking_ids = [booking_id for booking_id, _, _ in batch]
+                bookings = [json.loads(payload) for _, payload, _ in batch]
+                try:
+                    database = self.__get_database()
+                    # A booking that was retried (or recovered after a crash) may already be on the sheet
+                    retried = [booking for booking, (_, _, tries) in zip(bookings, batch) if tries > 0]
+                    already_saved = {str(booking["id"]) for booking in retried if database.has_booking(booking["id"])}
+                    to_upload = [booking for booking in bookings if str(booking["id"]) not in already_saved]
+                    saved = database.add_bookings(to_upload) if to_upload else True
+                    error = None if saved else "Could not reach the booking database"
+                except Exception as e:
+                    saved = False
+                    error = str(e)
+
+                if saved:
+                    attempts = 0
+                    with self.__lock, self.__connect() as connection:
+                        # A booking cancelled while its upload was in flight still needs that change written
+                        changed = []
+                        for booking_id, payload, _ in batch:
+                            row = connection.execute(
+                                "SELECT payload FROM pending_bookings WHERE booking_id = ?", (booking_id,)
+                            ).fetchone()
+                            if row is not None and row[0] != payload:
+                                changed.append(json.loads(row[0]))
+                        connection.executemany(
+                            "DELETE FROM pending_bookings WHERE booking_id = ?",
+                            [(booking_id,) for booking_id in booking_ids]
+                        )
+                    for booking in changed:
+                        try:
+                            self.__get_database().update_booking(booking)
+                        except Exception as e:
+                            print(f"Error applying late change to booking {booking['id']}: {e}")
+                    for booking_id in booking_ids:
+                        self.__notify(booking_id, True)
+                    continue
+
+                # Leave the batch in the spool and try again later
+                with self.__lock, self.__connect() as connection:
+                    connection.executemany(
+                        "UPDATE pending_bookings SET attempts = attempts + 1 WHERE booking_id = ?",
+                        [(booking_id,) for booking_id in booking_ids]
+                    )
+                for booking_id, _, tries in batch:
+                    if tries == 0:
+                        # Tell the user once that the booking is safe locally but not uploaded yet
+                        self.__notify(booking_id, False, error, keep_callback=True)
+                delay = self.__retry_delay(attempts)
+                attempts += 1
+                print(f"Booking upload failed ({error}), retrying in {delay:.0f}s")
+                time.sleep(delay)
+
+# One writer per process, shared by every booking screen
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_booking_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = BookingWriter()
+            _writer.start()
+        return _writer
@@ -0,0 +1,156 @@
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from storage_backends import MemoryStorage
+
+# Offline stand-ins for Google Sheets and OpenRouteService, used by benchmark_suite.py.
+# Both count every call and the bytes that would have crossed the network, and can add latency.
+
+class ApiStats:
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.calls = Counter()  # Method or endpoint -> number of calls
+        self.bytes = 0
+        self.overhead = 0.0  # Seconds spent measuring payloads, to subtract from wall time
+
+    def record(self, name, size, overhead=0.0):
+        with self.__lock:
+            self.calls[name] += 1
+            self.bytes += size
+            self.overhead += overhead
+
+    def snapshot(self):
+        with self.__lock:
+            return sum(self.calls.values()), self.bytes, self.overhead
+
+def payload_size(*parts):
+    """Rough size of what a request and its response would have sent, as JSON"""
+    return sum(len(json.dumps(part, default=str)) for part in parts)
+
+# Behaves like a remote worksheet: every call costs a round trip (plus transfer time) and is counted
+class FakeWorksheet:
+    def __init__(self, column_count, latency=0.0, bytes_per_second=None, stats=None):
+        self.__storage = MemoryStorage(column_count)
+        self.latency = latency
+        self.bytes_per_second = bytes_per_second
+        self.stats = stats or ApiStats()
+
+    def seed(self, rows):
+        """Load rows without counting them as API traffic"""
+        self.__storage.append_rows(rows)
+
+    def revision(self):
+        # Stands in for the Drive modifiedTime request: one small round trip
+        self.stats.record("revision", payload_size(self.__storage.revision()))
+        if self.latency:
+            time.sleep(self.latency)
+        return self.__storage.revision()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.__storage, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            started = time.perf_counter()
+            size = payload_size(args, kwargs, result)
+            overhead = time.perf_counter() - started
+            self.stats.record(name, size, overhead)
+
+            delay = self.latency
+            if self.bytes_per_second:
+                delay += size / self.bytes_per_second
+            if delay:
+                time.sleep(delay)
+            return result
+
+        return call
+
+# Serves canned OpenRouteService (and ipinfo) responses from a local HTTP server
+class StubORSServer:
+    def __init__(self, latency=0.0, route_points=200, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.route_points = route_points
+        self.stats = ApiStats()
+        self.__server = ThreadingHTTPServer((host, port), self.__handler_class())
+        self.__thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.__server.serve_forever, name="stub-ors", daemon=True)
+        self.__thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def __autocomplete(self, query):
+        text = query.get("text", [""])[0]
+        size = int(query.get("size", ["5"])[0])
+        return {
+            "features": [
+                {
+                    "properties": {"label": f"{text} {number}, Metro Manila"},
+                    "geometry": {"coordinates": [120.98 + number * 0.001, 14.59 + number * 0.001]},
+                }
+                for number in range(size)
+            ]
+        }
+
+    def __directions(self, query):
+        start_lon, start_lat = map(float, query.get("start", ["120.98,14.59"])[0].split(","))
+        end_lon, end_lat = map(float, query.get("end", ["121.05,14.55"])[0].split(","))
+        steps = max(2, self.route_points)
+        coordinates = [
+            [start_lon + (end_lon - start_lon) * step / (steps - 1), start_lat + (end_lat - start_lat) * step / (steps - 1)]
+            for step in range(steps)
+        ]
+        return {
+            "features": [
+                {
+                    "geometry": {"coordinates": coordinates},
+                    "properties": {"segments": [{"distance": 8500.0, "duration": 1260.0}]},
+                }
+            ]
+        }
+
+    def __handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path == "/geocode/autocomplete":
+                    body = stub._StubORSServer__autocomplete(query)
+                elif url.path == "/v2/directions/driving-car":
+                    body = stub._StubORSServer__directions(query)
+                elif url.path == "/json":
+                    body = {"loc": "14.5995,120.9842"}
+                else:
+                    self.send_error(404)
+                    return
+
+                if stub.latency:
+                    time.sleep(stub.latency)
+                data = json.dumps(body).encode()
+                stub.stats.record(url.path, len(self.path) + len(data))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
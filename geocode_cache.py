@@ -0,0 +1,128 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import settings
+
+# Remembers OpenRouteService autocomplete answers so places people type all day ("SM Megamall",
+# "NAIA Terminal 3") are suggested without a request. Queries are normalised before lookup, the
+# least recently used entries are dropped past max_entries, entries expire after ttl seconds, and
+# everything is kept in SQLite so the cache survives restarts.
+#
+# An answer with fewer results than were asked for is "complete": it holds every place matching that
+# text. A longer query that starts with such a text is answered by filtering those results.
+
+_NOT_WORD = re.compile(r"[^\w\s]+")
+
+def normalise_query(text):
+    """Lowercase, drop punctuation and collapse spaces, so 'SM  Megamall,' and 'sm megamall' share a key"""
+    return " ".join(_NOT_WORD.sub(" ", str(text).lower()).split())
+
+def label_matches(label, query_key):
+    """Whether every word of a normalised query starts some word of a place label"""
+    words = normalise_query(label).split()
+    return all(any(word.startswith(part) for word in words) for part in query_key.split())
+
+class GeocodeCache:
+    def __init__(self, path=None, ttl=None, max_entries=None, min_prefix=3):
+        self.ttl = settings.GEOCODE_CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or settings.GEOCODE_CACHE_MAX_ENTRIES
+        self.min_prefix = min_prefix  # Shortest text the app ever asks ORS about
+        self.__lock = threading.Lock()
+        self.__entries = OrderedDict()  # Query key -> (results, complete, fetched_at); most recently used last
+        self.__touched = {}  # Query key -> last use not yet written to disk
+        self.__connection = sqlite3.connect(path or settings.GEOCODE_CACHE_PATH, check_same_thread=False)
+
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                "query TEXT PRIMARY KEY, results TEXT NOT NULL, complete INTEGER NOT NULL, "
+                "fetched_at REAL NOT NULL, used_at REAL NOT NULL)"
+            )
+            self.__connection.execute("DELETE FROM geocode WHERE fetched_at <= ?", (time.time() - self.ttl,))
+            # Warm the memory copy with the most recently used entries, oldest first so LRU order is kept
+            rows = self.__connection.execute(
+                "SELECT query, results, complete, fetched_at FROM geocode ORDER BY used_at DESC LIMIT ?",
+                (self.max_entries,)
+            ).fetchall()
+            for query, results, complete, fetched_at in reversed(rows):
+                self.__entries[query] = ([tuple(result) for result in json.loads(results)], bool(complete), fetched_at)
+
+    def __fresh(self, key):
+        """The entry for key if it has not expired; expired entries are dropped"""
+        entry = self.__entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] <= time.time() - self.ttl:
+            del self.__entries[key]
+            self.__connection.execute("DELETE FROM geocode WHERE query = ?", (key,))
+            return None
+        return entry
+
+    def __touch(self, key):
+        # Hits stay off the disk; their use times are written with the next put
+        self.__entries.move_to_end(key)
+        self.__touched[key] = time.time()
+
+    def get(self, query):
+        """Cached [(label, [lon, lat])] for query, or None if ORS has to be asked"""
+        key = normalise_query(query)
+        with self.__lock, self.__connection:
+            entry = self.__fresh(key)
+            if entry is not None:
+                self.__touch(key)
+                return list(entry[0])
+
+            # A complete answer for a shorter prefix already holds every match for this text
+            for length in range(len(key) - 1, self.min_prefix - 1, -1):
+                prefix = key[:length].rstrip()
+                entry = self.__fresh(prefix)
+                if entry is not None and entry[1]:
+                    self.__touch(prefix)
+                    return [result for result in entry[0] if label_matches(result[0], key)]
+        return None
+
+    def put(self, query, results, complete):
+        """Store the suggestions ORS returned; complete means it returned fewer than it was asked for"""
+        key = normalise_query(query)
+        results = [(label, list(coords)) for label, coords in results]
+        now = time.time()
+        with self.__lock, self.__connection:
+            self.__entries[key] = (results, bool(complete), now)
+            self.__entries.move_to_end(key)
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO geocode (query, results, complete, fetched_at, used_at) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(results), int(bool(complete)), now, now)
+            )
+            self.__connection.executemany(
+                "UPDATE geocode SET used_at = ? WHERE query = ?", [(used_at, touched) for touched, used_at in self.__touched.items()]
+            )
+            self.__touched.clear()
+            while len(self.__entries) > self.max_entries:
+                evicted, _ = self.__entries.popitem(last=False)
+                self.__connection.execute("DELETE FROM geocode WHERE query = ?", (evicted,))
+
+    def clear(self):
+        with self.__lock, self.__connection:
+            self.__entries.clear()
+            self.__touched.clear()
+            self.__connection.execute("DELETE FROM geocode")
+
+_geocode_cache = None
+_geocode_cache_lock = threading.Lock()
+
+def get_geocode_cache():
+    """The process-wide geocoding cache"""
+    global _geocode_cache
+    with _geocode_cache_lock:
+        if _geocode_cache is None:
+            _geocode_cache = GeocodeCache()
+        return _geocode_cache
+
+def reset_geocode_cache():
+    """Reopen the cache from settings, e.g. after pointing GEOCODE_CACHE_PATH somewhere else"""
+    global _geocode_cache
+    with _geocode_cache_lock:
+        _geocode_cache = None
@@ -0,0 +1,100 @@
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+import settings
+
+# Keeps each client's booking history on disk so the history window can open without touching the sheet.
+# A client's "watermark" is the newest "Last Updated" stamp among their stored bookings; a refresh only
+# reads bookings stamped at or after it (minus a small overlap for clocks that disagree).
+
+STAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+class HistoryStore:
+    def __init__(self, path=None, overlap=None):
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path or settings.HISTORY_STORE_PATH, check_same_thread=False)
+        self.overlap = settings.HISTORY_REFRESH_OVERLAP if overlap is None else overlap
+
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS history ("
+                "client_id TEXT NOT NULL, position INTEGER NOT NULL, booking_id TEXT NOT NULL, row TEXT NOT NULL, "
+                "PRIMARY KEY (client_id, position))"
+            )
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS watermarks ("
+                "client_id TEXT PRIMARY KEY, last_updated TEXT NOT NULL, refreshed_at REAL NOT NULL)"
+            )
+
+    def load(self, client_id):
+        """Return the stored rows of a client in sheet order, or None if they were never stored"""
+        with self.__lock:
+            known = self.__connection.execute(
+                "SELECT 1 FROM watermarks WHERE client_id = ?", (str(client_id),)
+            ).fetchone()
+            if known is None:
+                return None
+            return [
+                json.loads(row) for (row,) in self.__connection.execute(
+                    "SELECT row FROM history WHERE client_id = ? ORDER BY position", (str(client_id),)
+                )
+            ]
+
+    def refresh_since(self, client_id):
+        """The "Last Updated" value to ask the sheet for changes from, or None for a full read"""
+        with self.__lock:
+            found = self.__connection.execute(
+                "SELECT last_updated FROM watermarks WHERE client_id = ?", (str(client_id),)
+            ).fetchone()
+        if found is None or not found[0]:
+            return None
+        try:
+            since = datetime.strptime(found[0], STAMP_FORMAT) - timedelta(seconds=self.overlap)
+            return since.strftime(STAMP_FORMAT)
+        except ValueError:
+            return None
+
+    def save(self, client_id, rows, stamp_column):
+        """Replace a client's stored history and move their watermark to the newest stamp in rows"""
+        watermark = max((str(row[stamp_column]) for row in rows if len(row) > stamp_column), default="")
+        with self.__lock, self.__connection:
+            self.__connection.execute("DELETE FROM history WHERE client_id = ?", (str(client_id),))
+            self.__connection.executemany(
+                "INSERT INTO history (client_id, position, booking_id, row) VALUES (?, ?, ?, ?)",
+                [(str(client_id), position, str(row[0]), json.dumps(row)) for position, row in enumerate(rows)]
+            )
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO watermarks (client_id, last_updated, refreshed_at) VALUES (?, ?, ?)",
+                (str(client_id), watermark, time.time())
+            )
+
+    def forget(self, client_id):
+        with self.__lock, self.__connection:
+            self.__connection.execute("DELETE FROM history WHERE client_id = ?", (str(client_id),))
+            self.__connection.execute("DELETE FROM watermarks WHERE client_id = ?", (str(client_id),))
+
+def merge_history(stored_rows, changed_rows, booking_ids):
+    """Apply changed rows over stored ones, keeping the sheet's order and dropping bookings that are gone"""
+    by_id = {str(row[0]): row for row in stored_rows or []}
+    for row in changed_rows:
+        by_id[str(row[0])] = row
+    return [by_id[str(booking_id)] for booking_id in booking_ids if str(booking_id) in by_id]
+
+_history_store = None
+_history_store_lock = threading.Lock()
+
+def get_history_store():
+    """The process-wide history store"""
+    global _history_store
+    with _history_store_lock:
+        if _history_store is None:
+            _history_store = HistoryStore()
+        return _history_store
+
+def reset_history_store():
+    """Reopen the store from settings, e.g. after pointing HISTORY_STORE_PATH somewhere else"""
+    global _history_store
+    with _history_store_lock:
+        _history_store = None
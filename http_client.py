@@ -0,0 +1,228 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import requests
+from requests.adapters import HTTPAdapter
+import settings
+
+# One pooled HTTP session for the external services (OpenRouteService, ipinfo), so calls reuse
+# kept-alive connections instead of paying a TCP and TLS handshake each time.
+#
+# Each endpoint has a time budget for the whole call and retries, with jittered backoff, only while
+# that budget lasts. A circuit breaker per service stops calling a service that keeps failing until
+# it has had time to recover, and slow idempotent calls can be hedged with a second request.
+# Latency of every call is recorded per endpoint.
+
+# timeout: (connect, read) seconds per attempt; budget: seconds for the whole call including retries
+ENDPOINTS = {
+    "autocomplete": {"service": "ors", "timeout": (2, 3), "budget": 5, "retries": 1, "hedge": True},
+    "directions": {"service": "ors", "timeout": (3, 8), "budget": 10, "retries": 2, "hedge": True},
+    "ipinfo": {"service": "ipinfo", "timeout": (2, 3), "budget": 5, "retries": 1, "hedge": False},
+}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling a service whose circuit breaker is open"""
+
+# Opens after failure_threshold failures in a row; after cooldown one trial call is let through,
+# and its outcome closes the circuit again or restarts the cooldown
+class CircuitBreaker:
+    def __init__(self, failure_threshold, cooldown):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.__lock = threading.Lock()
+        self.__failures = 0
+        self.__opened_at = None
+        self.__trial_running = False
+
+    @property
+    def state(self):
+        with self.__lock:
+            if self.__opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self.__opened_at >= self.cooldown else "open"
+
+    def allow(self):
+        with self.__lock:
+            if self.__opened_at is None:
+                return True
+            if time.monotonic() - self.__opened_at < self.cooldown or self.__trial_running:
+                return False
+            self.__trial_running = True
+            return True
+
+    def record_success(self):
+        with self.__lock:
+            self.__failures = 0
+            self.__opened_at = None
+            self.__trial_running = False
+
+    def record_failure(self):
+        with self.__lock:
+            self.__failures += 1
+            if self.__trial_running or self.__failures >= self.failure_threshold:
+                self.__opened_at = time.monotonic()
+            self.__trial_running = False
+
+class EndpointMetrics:
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.hedges = 0
+        self.latencies = deque(maxlen=window)  # Seconds per call, most recent window
+
+    def count(self, counter):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def record_call(self, seconds, failed):
+        with self.lock:
+            self.calls += 1
+            self.failures += failed
+            self.latencies.append(seconds)
+
+    def snapshot(self):
+        with self.lock:
+            ordered = sorted(self.latencies)
+            counts = {"calls": self.calls, "failures": self.failures, "retries": self.retries, "hedges": self.hedges}
+
+        def percentile(fraction):
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+        return {
+            **counts,
+            "mean_ms": sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+        }
+
+class HttpClient:
+    def __init__(self, pool_size=None, hedge_after=None, breaker_failures=None, breaker_cooldown=None):
+        self.hedge_after = settings.HTTP_HEDGE_AFTER if hedge_after is None else hedge_after  # 0 turns hedging off
+        self.__breaker_failures = breaker_failures or settings.HTTP_BREAKER_FAILURES
+        self.__breaker_cooldown = settings.HTTP_BREAKER_COOLDOWN if breaker_cooldown is None else breaker_cooldown
+        pool_size = pool_size or settings.HTTP_POOL_SIZE
+
+        self.__session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(ENDPOINTS), pool_maxsize=pool_size)
+        self.__session.mount("https://", adapter)
+        self.__session.mount("http://", adapter)
+        self.__hedge_pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="http-hedge")
+
+        self.__lock = threading.Lock()
+        self.__breakers = {}  # Service -> CircuitBreaker
+        self.__metrics = {}  # Endpoint -> EndpointMetrics
+
+    def breaker(self, service):
+        with self.__lock:
+            if service not in self.__breakers:
+                self.__breakers[service] = CircuitBreaker(self.__breaker_failures, self.__breaker_cooldown)
+            return self.__breakers[service]
+
+    def __endpoint_metrics(self, endpoint):
+        with self.__lock:
+            return self.__metrics.setdefault(endpoint, EndpointMetrics())
+
+    def metrics(self):
+        """{endpoint: calls, failures, retries, hedges and latency figures in milliseconds}"""
+        with self.__lock:
+            return {endpoint: metrics.snapshot() for endpoint, metrics in self.__metrics.items()}
+
+    def get(self, endpoint, url, params=None, headers=None):
+        """GET url under the named endpoint's timeouts, retries and circuit breaker; returns the last response"""
+        spec = ENDPOINTS[endpoint]
+        breaker = self.breaker(spec["service"])
+        metrics = self.__endpoint_metrics(endpoint)
+        started = time.monotonic()
+        deadline = started + spec["budget"]
+        attempt = 0
+        failed = True
+        try:
+            while True:
+                if not breaker.allow():
+                    raise CircuitOpenError(f"{spec['service']} is failing; not calling it for a while")
+                connect_timeout, read_timeout = spec["timeout"]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise requests.exceptions.Timeout(f"{endpoint} ran out of its {spec['budget']} s budget")
+                timeout = (min(connect_timeout, remaining), min(read_timeout, remaining))
+                try:
+                    response = self.__send(spec, metrics, url, params, headers, timeout)
+                except BaseException as e:
+                    # Whatever went wrong counts against the service, which also ends a half-open trial;
+                    # only connection errors and timeouts are worth another attempt
+                    breaker.record_failure()
+                    retryable = isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+                    if not retryable or not self.__wait_to_retry(spec, metrics, attempt, deadline):
+                        raise
+                else:
+                    if response.status_code not in RETRY_STATUSES:
+                        breaker.record_success()
+                        failed = False
+                        return response
+                    breaker.record_failure()
+                    if not self.__wait_to_retry(spec, metrics, attempt, deadline):
+                        return response
+                attempt += 1
+        finally:
+            metrics.record_call(time.monotonic() - started, failed)
+
+    def __wait_to_retry(self, spec, metrics, attempt, deadline):
+        """Sleep before the next attempt; False when out of retries or out of budget"""
+        if attempt >= spec["retries"]:
+            return False
+        # Full jitter: a random wait up to the exponential backoff, so clients don't retry in lockstep
+        delay = random.uniform(0, min(settings.HTTP_MAX_BACKOFF, settings.HTTP_BASE_BACKOFF * 2 ** attempt))
+        if time.monotonic() + delay >= deadline:
+            return False
+        time.sleep(delay)
+        metrics.count("retries")
+        return True
+
+    def __send(self, spec, metrics, url, params, headers, timeout):
+        def request():
+            return self.__session.get(url, params=params, headers=headers, timeout=timeout)
+
+        if not (spec["hedge"] and self.hedge_after):
+            return request()
+
+        # Hedging: if the first request is slow, send a second one and take whichever answers first
+        primary = self.__hedge_pool.submit(request)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        if done:
+            return primary.result()
+        metrics.count("hedges")
+        pending = {primary, self.__hedge_pool.submit(request)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except requests.exceptions.RequestException as e:
+                    error = e
+        raise error
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+def get_http_client():
+    """The process-wide HTTP client"""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = HttpClient()
+        return _http_client
+
+def reset_http_client():
+    """Start again with fresh connections, breakers and metrics, e.g. between benchmark runs"""
+    global _http_client
+    with _http_client_lock:
+        _http_client = None
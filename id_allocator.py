@@ -0,0 +1,74 @@
+import os
+import socket
+import threading
+import time
+from storage_backends import appended_row_number, open_storage
+
+# Hands out user IDs without reading the user sheet. Each process leases a block of IDs by appending
+# one row to the "id_leases" table; appends never share a row, so the row number the append landed on
+# is a block nobody else can hold, and an append of several rows leases that many neighbouring blocks.
+# IDs in a block are then given out from memory, so a signup is still a single append to the user
+# sheet and only every ID_BLOCK_SIZE-th one costs a lease.
+#
+# Block n covers ID_BASE + n * ID_BLOCK_SIZE up to the next block. The base sits above the old random
+# 4-digit IDs, so new IDs can never clash with an existing account. IDs left over in a block when the
+# process exits are simply never used.
+
+# Fixed for the life of the lease table: a lease row records its block only through its row number,
+# so changing either value (or running processes with different ones) would make blocks overlap
+ID_BASE = 10000
+ID_BLOCK_SIZE = 100
+
+class IdAllocator:
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__next = 0
+        self.__end = 0  # Nothing leased yet
+
+    def __lease_blocks(self, count):
+        """Claim count neighbouring blocks with one append and make them the current range"""
+        holder = f"{socket.gethostname()}:{os.getpid()}"
+        leased_at = time.strftime("%Y-%m-%d %H:%M:%S")
+        response = open_storage("id_leases").append_rows(
+            [[holder, leased_at] for _ in range(count)], value_input_option='RAW'
+        )
+        row_number = appended_row_number(response)
+        if row_number is None:
+            raise RuntimeError("Could not lease a block of user IDs: the append did not report its row")
+        # One append fills neighbouring rows, and the table has no header row, so row 1 is block 0
+        self.__next = ID_BASE + (row_number - 1) * ID_BLOCK_SIZE
+        self.__end = self.__next + count * ID_BLOCK_SIZE
+
+    def allocate(self, count=1):
+        """Return count unused IDs as strings; a shortfall is leased with a single append"""
+        ids = []
+        with self.__lock:
+            while len(ids) < count:
+                if self.__next >= self.__end:
+                    missing = count - len(ids)
+                    self.__lease_blocks(-(-missing // ID_BLOCK_SIZE))
+                take = min(count - len(ids), self.__end - self.__next)
+                ids.extend(str(user_id) for user_id in range(self.__next, self.__next + take))
+                self.__next += take
+        return ids
+
+    def next_id(self):
+        """One unused ID"""
+        return self.allocate(1)[0]
+
+_id_allocator = None
+_id_allocator_lock = threading.Lock()
+
+def get_id_allocator():
+    """The process-wide ID allocator"""
+    global _id_allocator
+    with _id_allocator_lock:
+        if _id_allocator is None:
+            _id_allocator = IdAllocator()
+        return _id_allocator
+
+def reset_id_allocator():
+    """Drop the current block, e.g. after switching storage backends"""
+    global _id_allocator
+    with _id_allocator_lock:
+        _id_allocator = None
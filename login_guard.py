@@ -0,0 +1,111 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
+import settings
+
+# Answers repeated failed logins without touching the user sheet.
+# Failed (user ID, credentials) pairs are remembered for a short while, and an ID that keeps failing
+# is locked for a cooldown, so a mistyped password retried in a loop costs no API calls.
+# Credentials are only ever held as a hash.
+
+def credential_hash(email, passcode):
+    """Hash of the normalised email and passcode"""
+    text = f"{str(email).strip().lower()}\0{passcode}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class LoginGuard:
+    def __init__(self, negative_ttl=None, max_failures=None, failure_window=None, lockout=None, max_ids=10000):
+        self.negative_ttl = settings.LOGIN_NEGATIVE_TTL if negative_ttl is None else negative_ttl
+        self.max_failures = settings.LOGIN_MAX_FAILURES if max_failures is None else max_failures
+        self.failure_window = settings.LOGIN_FAILURE_WINDOW if failure_window is None else failure_window
+        self.lockout = settings.LOGIN_LOCKOUT if lockout is None else lockout
+        self.__max_ids = max_ids  # Bounds memory when a script cycles through IDs
+        self.__lock = threading.Lock()
+        self.__failed = OrderedDict()  # User ID -> {credential hash: expiry}
+        self.__attempts = OrderedDict()  # User ID -> deque of failure times
+        self.__locked_until = {}  # User ID -> time the lockout ends
+
+    @staticmethod
+    def __key(user_id, email, passcode):
+        return str(user_id).strip(), credential_hash(email, passcode)
+
+    def blocked_for(self, user_id):
+        """Seconds until this ID may try again, or 0 if it is not locked"""
+        user_id = str(user_id).strip()
+        with self.__lock:
+            remaining = self.__locked_until.get(user_id, 0) - time.monotonic()
+            if remaining <= 0:
+                self.__locked_until.pop(user_id, None)
+                return 0
+            return remaining
+
+    def known_failure(self, user_id, email, passcode):
+        """Whether these exact credentials failed for this ID within the last negative_ttl seconds"""
+        user_id, credentials = self.__key(user_id, email, passcode)
+        with self.__lock:
+            failed = self.__failed.get(user_id, {})
+            expiry = failed.get(credentials)
+            if expiry is None:
+                return False
+            if expiry <= time.monotonic():
+                del failed[credentials]
+                return False
+            return True
+
+    def allows(self, user_id, email, passcode):
+        """Whether an attempt should be checked against the sheet at all"""
+        return not self.blocked_for(user_id) and not self.known_failure(user_id, email, passcode)
+
+    def record_failure(self, user_id, email, passcode):
+        """Remember a failed attempt; locks the ID once it fails max_failures times within failure_window"""
+        user_id, credentials = self.__key(user_id, email, passcode)
+        now = time.monotonic()
+        with self.__lock:
+            failed = self.__failed.setdefault(user_id, {})
+            self.__failed.move_to_end(user_id)
+            failed[credentials] = now + self.negative_ttl
+            for stale in [key for key, expiry in failed.items() if expiry <= now]:
+                del failed[stale]
+            while len(self.__failed) > self.__max_ids:
+                self.__failed.popitem(last=False)
+
+            attempts = self.__attempts.setdefault(user_id, deque())
+            self.__attempts.move_to_end(user_id)
+            attempts.append(now)
+            while attempts and attempts[0] <= now - self.failure_window:
+                attempts.popleft()
+            if len(attempts) >= self.max_failures:
+                self.__locked_until[user_id] = now + self.lockout
+                attempts.clear()
+            while len(self.__attempts) > self.__max_ids:
+                self.__attempts.popitem(last=False)
+
+    def record_success(self, user_id):
+        """A good login clears the ID's failure count"""
+        self.forget(user_id)
+
+    def forget(self, user_id):
+        """Drop everything remembered about an ID, e.g. when its account is created"""
+        user_id = str(user_id).strip()
+        with self.__lock:
+            self.__attempts.pop(user_id, None)
+            self.__locked_until.pop(user_id, None)
+            self.__failed.pop(user_id, None)
+
+_login_guard = None
+_login_guard_lock = threading.Lock()
+
+def get_login_guard():
+    """The process-wide login guard"""
+    global _login_guard
+    with _login_guard_lock:
+        if _login_guard is None:
+            _login_guard = LoginGuard()
+        return _login_guard
+
+def reset_login_guard():
+    """Forget every failed attempt, e.g. between benchmark runs"""
+    global _login_guard
+    with _login_guard_lock:
+        _login_guard = None
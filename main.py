@@ -1,9 +1,12 @@
 import tkinter as tk 
 from tkinter import messagebox
 from PIL import Image, ImageTk
-from user_info_database import UserInfoDatabase
+from user_info_database import UserInfoDatabase, signup_error
 from account_portal import AccountPage
 from appointment_page import TransportBookingSystem
+from sheets_registry import get_registry
+from login_guard import get_login_guard
+import settings
 
 # Contains the main log-in and sign-up page
 # It will serve as the main welcome page to teh program
@@ -28,6 +31,9 @@ class LandingPage:
         }
         self.root.configure(bg="#FFF8E8")
         self.database = UserInfoDatabase()
+        # Open the booking sheet in the background so the booking and history screens start warm
+        if settings.STORAGE_BACKEND == "sheets":
+            get_registry().warm_up([settings.BOOKING_SHEET_ID])
         self.current_frame = None
         self.show_welcome_menu()
 
@@ -136,20 +142,10 @@ class LandingPage:
         password = self.signup_password.get()
         address = self.signup_address.get()
 
-        if len(name) < 2:
-            messagebox.showerror("Error", "Name must be at least 2 characters.")
-            return
-        if not contact.isdigit() or not (10 <= len(contact) <= 13):
-            messagebox.showerror("Error", "Contact number must be 10–13 digits.")
-            return
-        if "@" not in email or "." not in email:
-            messagebox.showerror("Error", "Please enter a valid email address.")
-            return
-        if len(password) < 4 or not password.isalnum():
-            messagebox.showerror("Error", "Password must be at least 4 alphanumeric characters.")
-            return
-        if not all([name, contact, email, password, address]):
-            messagebox.showerror("Error", "Please fill in all fields.")
+        # Same rules as bulk uploads (UserInfoDatabase.upload_users)
+        error = signup_error(name, contact, email, password, address)
+        if error:
+            messagebox.showerror("Error", error)
         else:
             try:
                 # Uploads the user infromation logged in to the spreedsheet as a database
@@ -174,6 +170,12 @@ class LandingPage:
             messagebox.showerror("Error", "Please enter all login details.")
             return
 
+        # An ID that failed too many times in a row is locked for a while
+        wait = get_login_guard().blocked_for(user_id)
+        if wait:
+            messagebox.showerror("Error", f"Too many failed attempts. Try again in {int(wait) + 1} seconds.")
+            return
+
         # Utilizes the database to verify whether the account is present and already created
         user = self.database.find_user_by_credentials(user_id, email, password)  
 
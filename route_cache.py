@@ -0,0 +1,147 @@
+import math
+import sqlite3
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+import settings
+
+# Remembers OpenRouteService routes so a trip that was already asked for (the same office to the same
+# mall) is drawn without a request. Both ends are snapped to a grid of grid_meters, so points a few
+# metres apart share an entry. Routes live in SQLite with the geometry delta-encoded and compressed;
+# the most recently used ones are also kept decoded in memory. Entries expire after ttl seconds and
+# the least recently used are dropped past max_entries.
+
+METERS_PER_DEGREE = 111320.0
+GEOMETRY_SCALE = 100000  # Coordinates are stored to 1e-5 degrees, about a metre
+
+def snap(point, grid_meters):
+    """Grid cell (row, column) holding a (lat, lon) point"""
+    lat, lon = point
+    lat_step = grid_meters / METERS_PER_DEGREE
+    # Longitude cells narrow towards the poles; size them at the cell's latitude so they stay square
+    lon_step = grid_meters / (METERS_PER_DEGREE * max(math.cos(math.radians(round(lat / lat_step) * lat_step)), 0.01))
+    return round(lat / lat_step), round(lon / lon_step)
+
+def route_key(start, end, grid_meters):
+    """Cache key for a trip; direction matters, since one-way streets make A->B differ from B->A"""
+    start_row, start_col = snap(start, grid_meters)
+    end_row, end_col = snap(end, grid_meters)
+    return f"{grid_meters:g}:{start_row},{start_col}:{end_row},{end_col}"
+
+def encode_geometry(coords):
+    """[(lat, lon)] -> compressed bytes of the differences between neighbouring points"""
+    deltas = array("i")
+    previous_lat = previous_lon = 0
+    for lat, lon in coords:
+        scaled_lat, scaled_lon = round(lat * GEOMETRY_SCALE), round(lon * GEOMETRY_SCALE)
+        deltas.extend((scaled_lat - previous_lat, scaled_lon - previous_lon))
+        previous_lat, previous_lon = scaled_lat, scaled_lon
+    return zlib.compress(deltas.tobytes())
+
+def decode_geometry(blob):
+    deltas = array("i")
+    deltas.frombytes(zlib.decompress(blob))
+    coords = []
+    lat = lon = 0
+    for position in range(0, len(deltas), 2):
+        lat += deltas[position]
+        lon += deltas[position + 1]
+        coords.append((lat / GEOMETRY_SCALE, lon / GEOMETRY_SCALE))
+    return coords
+
+class RouteCache:
+    def __init__(self, path=None, grid_meters=None, ttl=None, max_entries=None, memory_entries=None):
+        self.grid_meters = grid_meters or settings.ROUTE_CACHE_GRID_METERS
+        self.ttl = settings.ROUTE_CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or settings.ROUTE_CACHE_MAX_ENTRIES
+        self.memory_entries = memory_entries or settings.ROUTE_CACHE_MEMORY_ENTRIES
+        self.__lock = threading.Lock()
+        self.__memory = OrderedDict()  # Key -> (coords, distance_km, duration_min, fetched_at); most recently used last
+        self.__touched = {}  # Key -> last use not yet written to disk
+        self.__connection = sqlite3.connect(path or settings.ROUTE_CACHE_PATH, check_same_thread=False)
+
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS routes ("
+                "key TEXT PRIMARY KEY, geometry BLOB NOT NULL, distance_km REAL NOT NULL, "
+                "duration_min REAL NOT NULL, fetched_at REAL NOT NULL, used_at REAL NOT NULL)"
+            )
+            self.__connection.execute("CREATE INDEX IF NOT EXISTS idx_routes_used_at ON routes (used_at)")
+            self.__connection.execute("DELETE FROM routes WHERE fetched_at <= ?", (time.time() - self.ttl,))
+
+    def __remember(self, key, entry):
+        self.__memory[key] = entry
+        self.__memory.move_to_end(key)
+        while len(self.__memory) > self.memory_entries:
+            self.__memory.popitem(last=False)
+
+    def get(self, start, end):
+        """(coords, distance_km, duration_min) for a trip, or None if ORS has to be asked"""
+        key = route_key(start, end, self.grid_meters)
+        with self.__lock:
+            entry = self.__memory.get(key)
+            if entry is None:
+                found = self.__connection.execute(
+                    "SELECT geometry, distance_km, duration_min, fetched_at FROM routes WHERE key = ?", (key,)
+                ).fetchone()
+                if found is None:
+                    return None
+                geometry, distance_km, duration_min, fetched_at = found
+                entry = (decode_geometry(geometry), distance_km, duration_min, fetched_at)
+
+            if entry[3] <= time.time() - self.ttl:
+                self.__memory.pop(key, None)
+                with self.__connection:
+                    self.__connection.execute("DELETE FROM routes WHERE key = ?", (key,))
+                return None
+
+            # Hits stay off the disk; their use times are written with the next put
+            self.__remember(key, entry)
+            self.__touched[key] = time.time()
+            return list(entry[0]), entry[1], entry[2]
+
+    def put(self, start, end, coords, distance_km, duration_min):
+        """Store a route ORS returned"""
+        key = route_key(start, end, self.grid_meters)
+        now = time.time()
+        with self.__lock, self.__connection:
+            self.__remember(key, (list(coords), distance_km, duration_min, now))
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO routes (key, geometry, distance_km, duration_min, fetched_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, encode_geometry(coords), distance_km, duration_min, now, now)
+            )
+            self.__connection.executemany(
+                "UPDATE routes SET used_at = ? WHERE key = ?", [(used_at, touched) for touched, used_at in self.__touched.items()]
+            )
+            self.__touched.clear()
+            # Least recently used routes beyond max_entries go
+            self.__connection.execute(
+                "DELETE FROM routes WHERE key IN (SELECT key FROM routes ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        with self.__lock, self.__connection:
+            self.__memory.clear()
+            self.__touched.clear()
+            self.__connection.execute("DELETE FROM routes")
+
+_route_cache = None
+_route_cache_lock = threading.Lock()
+
+def get_route_cache():
+    """The process-wide route cache"""
+    global _route_cache
+    with _route_cache_lock:
+        if _route_cache is None:
+            _route_cache = RouteCache()
+        return _route_cache
+
+def reset_route_cache():
+    """Reopen the cache from settings, e.g. after pointing ROUTE_CACHE_PATH somewhere else"""
+    global _route_cache
+    with _route_cache_lock:
+        _route_cache = None
@@ -0,0 +1,77 @@
+import os
+
+# App-wide configuration. Every value can be overridden with an environment variable
+# so a site can switch storage or files without editing code.
+
+# Google Sheets
+CREDENTIALS_FILE = os.environ.get("SWIFT_CREDENTIALS_FILE", "credentials.json")
+BOOKING_SHEET_ID = os.environ.get("SWIFT_BOOKING_SHEET_ID", "1i3lWKS-o8VjeGykXbRP27MZS0xniY490DAibQgNMwoE")
+USER_SHEET_ID = os.environ.get("SWIFT_USER_SHEET_ID", "13GKmBOKz_XvvAFdGGqSoDRS7UTlvf_YqUNSCdD6hceI")
+
+# Where bookings and users are stored: "sheets", "sqlite" or "memory"
+STORAGE_BACKEND = os.environ.get("SWIFT_STORAGE_BACKEND", "sheets")
+SQLITE_PATH = os.environ.get("SWIFT_SQLITE_PATH", "swift_booking.db")
+
+# Booking cache: how long (seconds) cached bookings are trusted before a cheap staleness check,
+# and how many clients' booking lists are kept in memory
+BOOKING_CACHE_TTL = float(os.environ.get("SWIFT_BOOKING_CACHE_TTL", "30"))
+BOOKING_CACHE_MAX_CLIENTS = int(os.environ.get("SWIFT_BOOKING_CACHE_MAX_CLIENTS", "200"))
+
+# External services
+ORS_API_KEY = os.environ.get("SWIFT_ORS_API_KEY", "5b3ce3597851110001cf624821c48bd478e94f3692170e872d0eeca3")
+ORS_BASE_URL = os.environ.get("SWIFT_ORS_BASE_URL", "https://api.openrouteservice.org")
+IPINFO_URL = os.environ.get("SWIFT_IPINFO_URL", "https://ipinfo.io/json")
+
+# Bookings waiting to be uploaded are spooled to this file; the writer uploads up to batch size at a
+# time and backs off (seconds) between failed attempts
+BOOKING_SPOOL_PATH = os.environ.get("SWIFT_BOOKING_SPOOL_PATH", "booking_spool.db")
+BOOKING_SPOOL_BATCH_SIZE = int(os.environ.get("SWIFT_BOOKING_SPOOL_BATCH_SIZE", "50"))
+BOOKING_SPOOL_BASE_DELAY = float(os.environ.get("SWIFT_BOOKING_SPOOL_BASE_DELAY", "2"))
+BOOKING_SPOOL_MAX_DELAY = float(os.environ.get("SWIFT_BOOKING_SPOOL_MAX_DELAY", "120"))
+
+# Per-user booking history kept on disk, and how far (seconds) before the newest stored
+# "Last Updated" stamp a refresh starts reading, to allow for clocks that disagree
+HISTORY_STORE_PATH = os.environ.get("SWIFT_HISTORY_STORE_PATH", "swift_history.db")
+HISTORY_REFRESH_OVERLAP = float(os.environ.get("SWIFT_HISTORY_REFRESH_OVERLAP", "300"))
+
+# New user IDs come from blocks leased on this tab of the user spreadsheet (see id_allocator.py,
+# where the block size and first ID are fixed)
+USER_ID_LEASE_WORKSHEET = os.environ.get("SWIFT_USER_ID_LEASE_WORKSHEET", "ID Leases")
+
+# Bulk user uploads are split into appends of at most this many rows and bytes, well under the
+# Sheets API request size limits
+USER_UPLOAD_MAX_ROWS = int(os.environ.get("SWIFT_USER_UPLOAD_MAX_ROWS", "2000"))
+USER_UPLOAD_MAX_BYTES = int(os.environ.get("SWIFT_USER_UPLOAD_MAX_BYTES", "1000000"))
+
+# Failed logins: how long (seconds) a wrong ID/email/password combination is answered locally, and how
+# many failures within the window lock an ID for the lockout period
+LOGIN_NEGATIVE_TTL = float(os.environ.get("SWIFT_LOGIN_NEGATIVE_TTL", "60"))
+LOGIN_MAX_FAILURES = int(os.environ.get("SWIFT_LOGIN_MAX_FAILURES", "5"))
+LOGIN_FAILURE_WINDOW = float(os.environ.get("SWIFT_LOGIN_FAILURE_WINDOW", "300"))
+LOGIN_LOCKOUT = float(os.environ.get("SWIFT_LOGIN_LOCKOUT", "60"))
+
+# Autocomplete suggestions kept on disk: file, how long (seconds) an answer is reused and how many queries are kept
+GEOCODE_CACHE_PATH = os.environ.get("SWIFT_GEOCODE_CACHE_PATH", "swift_geocode.db")
+GEOCODE_CACHE_TTL = float(os.environ.get("SWIFT_GEOCODE_CACHE_TTL", str(7 * 24 * 3600)))
+GEOCODE_CACHE_MAX_ENTRIES = int(os.environ.get("SWIFT_GEOCODE_CACHE_MAX_ENTRIES", "5000"))
+
+# Background threads that run autocomplete lookups, so a slow ORS response never blocks typing
+AUTOCOMPLETE_WORKERS = int(os.environ.get("SWIFT_AUTOCOMPLETE_WORKERS", "3"))
+
+# Shared HTTP client for ORS and ipinfo: pooled connections, retry backoff (seconds), circuit breaker
+# (failures in a row before a service is left alone for the cooldown) and hedging (seconds before a
+# slow request gets a backup request; 0 turns hedging off)
+HTTP_POOL_SIZE = int(os.environ.get("SWIFT_HTTP_POOL_SIZE", "8"))
+HTTP_BASE_BACKOFF = float(os.environ.get("SWIFT_HTTP_BASE_BACKOFF", "0.2"))
+HTTP_MAX_BACKOFF = float(os.environ.get("SWIFT_HTTP_MAX_BACKOFF", "2"))
+HTTP_BREAKER_FAILURES = int(os.environ.get("SWIFT_HTTP_BREAKER_FAILURES", "5"))
+HTTP_BREAKER_COOLDOWN = float(os.environ.get("SWIFT_HTTP_BREAKER_COOLDOWN", "30"))
+HTTP_HEDGE_AFTER = float(os.environ.get("SWIFT_HTTP_HEDGE_AFTER", "0"))
+
+# Routes kept on disk: trip ends are snapped to a grid this many metres wide, so nearby pickups
+# share a route; how long (seconds) a route is reused, how many are kept, and how many stay in memory
+ROUTE_CACHE_PATH = os.environ.get("SWIFT_ROUTE_CACHE_PATH", "swift_routes.db")
+ROUTE_CACHE_GRID_METERS = float(os.environ.get("SWIFT_ROUTE_CACHE_GRID_METERS", "20"))
+ROUTE_CACHE_TTL = float(os.environ.get("SWIFT_ROUTE_CACHE_TTL", str(30 * 24 * 3600)))
+ROUTE_CACHE_MAX_ENTRIES = int(os.environ.get("SWIFT_ROUTE_CACHE_MAX_ENTRIES", "5000"))
+ROUTE_CACHE_MEMORY_ENTRIES = int(os.environ.get("SWIFT_ROUTE_CACHE_MEMORY_ENTRIES", "200"))
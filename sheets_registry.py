@@ -0,0 +1,106 @@
+import threading
+from datetime import datetime, timedelta
+import gspread
+from google.auth.transport.requests import Request
+from google.oauth2.service_account import Credentials
+import settings
+
+# Drive metadata is only read for each spreadsheet's modifiedTime, the cheap change check behind the caches
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive.metadata.readonly']
+
+# One authorized Sheets client and one handle per worksheet for the whole process.
+# Screens used to re-read credentials.json, authorize and open the spreadsheet every time
+# they were built; now only the first caller pays for that.
+class SheetsClientRegistry:
+    def __init__(self, credentials_file=None, refresh_margin=300):
+        self.__credentials_file = credentials_file or settings.CREDENTIALS_FILE
+        self.__refresh_margin = refresh_margin  # Seconds before expiry to fetch a new token
+        self.__lock = threading.Lock()
+        self.__creds = None
+        self.__client = None
+        self.__worksheets = {}  # Sheet ID (or sheet ID and tab title) -> worksheet
+        self.__refresher = None
+        self.__stopped = threading.Event()
+
+    def client(self):
+        """The shared, authorized gspread client"""
+        with self.__lock:
+            if self.__client is None:
+                self.__creds = Credentials.from_service_account_file(self.__credentials_file, scopes=SCOPES)
+                self.__client = gspread.authorize(self.__creds)
+                self.__start_refresher()
+            return self.__client
+
+    def worksheet(self, sheet_id, title=None, column_count=26):
+        """The first worksheet of a spreadsheet (or the tab called title, created if missing), opened once and reused"""
+        client = self.client()
+        key = sheet_id if title is None else (sheet_id, title)
+        with self.__lock:
+            if key not in self.__worksheets:
+                spreadsheet = client.open_by_key(sheet_id)
+                if title is None:
+                    self.__worksheets[key] = spreadsheet.sheet1
+                else:
+                    try:
+                        self.__worksheets[key] = spreadsheet.worksheet(title)
+                    except gspread.WorksheetNotFound:
+                        try:
+                            self.__worksheets[key] = spreadsheet.add_worksheet(title, rows=100, cols=column_count)
+                        except gspread.exceptions.APIError:
+                            # Another process created the tab first
+                            self.__worksheets[key] = spreadsheet.worksheet(title)
+            return self.__worksheets[key]
+
+    def forget(self, sheet_id, title=None):
+        """Drop a cached handle, e.g. after the spreadsheet was replaced"""
+        with self.__lock:
+            self.__worksheets.pop(sheet_id if title is None else (sheet_id, title), None)
+
+    # Opens spreadsheets in the background so the first screen that needs them finds them ready
+    def warm_up(self, sheet_ids):
+        def open_all():
+            for sheet_id in sheet_ids:
+                try:
+                    self.worksheet(sheet_id)
+                except Exception as e:
+                    print(f"Could not open spreadsheet {sheet_id}: {e}")
+
+        threading.Thread(target=open_all, name="sheets-warm-up", daemon=True).start()
+
+    def __start_refresher(self):
+        if self.__refresher is None:
+            self.__refresher = threading.Thread(target=self.__keep_token_fresh, name="sheets-token-refresh", daemon=True)
+            self.__refresher.start()
+
+    def __seconds_until_refresh(self):
+        expiry = self.__creds.expiry  # Naive UTC, None until the first token is fetched
+        if expiry is None:
+            return 0
+        refresh_at = expiry - timedelta(seconds=self.__refresh_margin)
+        return max(0, (refresh_at - datetime.utcnow()).total_seconds())
+
+    # Refreshes the OAuth token shortly before it expires so no request ever waits on it
+    def __keep_token_fresh(self):
+        while not self.__stopped.is_set():
+            if self.__stopped.wait(self.__seconds_until_refresh()):
+                return
+            try:
+                self.__creds.refresh(Request())
+            except Exception as e:
+                print(f"Token refresh failed: {e}")
+                # Try again shortly; requests will still refresh on demand if this keeps failing
+                self.__stopped.wait(30)
+
+    def stop(self):
+        self.__stopped.set()
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry():
+    """The process-wide Sheets client registry"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SheetsClientRegistry()
+        return _registry
@@ -0,0 +1,393 @@
+import abc
+import re
+import sqlite3
+import threading
+from gspread.cell import Cell
+from gspread.exceptions import APIError
+from gspread.utils import numericise_all, rowcol_to_a1
+import settings
+from sheets_registry import get_registry
+
+# Storage backends for the booking and user tables.
+#
+# Every backend speaks the same small slice of gspread's Worksheet API that the databases use
+# (row_values, col_values, get_all_values, get_all_records, get, batch_get, append_row, append_rows,
+# batch_update, update, update_cell, insert_row, delete_rows, findall) plus revision() (a cheap change
+# token, or None when the backend has none), so BookingDatabase, UserInfoDatabase and ManageHistory
+# work unchanged on any of them.
+
+# Layout of each table: its sheet, how many columns it has and which columns get a lookup index
+TABLES = {
+    "bookings": {
+        "sheet_id": settings.BOOKING_SHEET_ID,
+        "columns": 14,
+        # Booking ID, Client ID, Pickup Time, Status
+        "indexed_columns": {"booking_id": 1, "client_id": 2, "pickup_time": 11, "status": 13},
+    },
+    "users": {
+        "sheet_id": settings.USER_SHEET_ID,
+        "columns": 6,
+        # ID
+        "indexed_columns": {"id": 1},
+    },
+    # One row per leased block of user IDs (holder, leased at), kept on its own tab of the user spreadsheet
+    "id_leases": {
+        "sheet_id": settings.USER_SHEET_ID,
+        "worksheet": settings.USER_ID_LEASE_WORKSHEET,
+        "columns": 2,
+        "indexed_columns": {},
+    },
+}
+
+_RANGE_PART = re.compile(r"^([A-Za-z]*)(\d*)$")
+
+def _column_number(letters):
+    number = 0
+    for letter in letters.upper():
+        number = number * 26 + ord(letter) - ord("A") + 1
+    return number
+
+def parse_range(range_name):
+    """Split an A1 range like 'Sheet1!A2:B' into (first_row, first_col, last_row, last_col); open ends are None"""
+    range_name = range_name.split("!")[-1]
+    start, _, end = range_name.partition(":")
+
+    def parse_part(part):
+        match = _RANGE_PART.match(part)
+        if not match:
+            raise ValueError(f"Invalid range: {range_name}")
+        letters, digits = match.groups()
+        return (int(digits) if digits else None), (_column_number(letters) if letters else None)
+
+    first_row, first_col = parse_part(start)
+    if end:
+        last_row, last_col = parse_part(end)
+    else:
+        last_row, last_col = first_row, first_col
+    return first_row or 1, first_col or 1, last_row, last_col
+
+def appended_row_number(response):
+    """First row an append landed on, from its response (e.g. 'Sheet1!A42:N42' -> 42), or None"""
+    try:
+        return parse_range(response["updates"]["updatedRange"])[0]
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def _trim(values):
+    """Drop trailing blanks the way the Sheets API does"""
+    values = list(values)
+    while values and values[-1] == "":
+        values.pop()
+    return values
+
+def _cell_text(value):
+    return "" if value is None else str(value)
+
+# Wraps a real gspread worksheet
+class SheetsStorage:
+    def __init__(self, worksheet):
+        self.__worksheet = worksheet
+        self.__drive_allowed = True
+
+    def __getattr__(self, name):
+        # Everything except revision goes straight to gspread
+        return getattr(self.__worksheet, name)
+
+    def revision(self):
+        """The spreadsheet's Drive modifiedTime, a small metadata request; None if Drive can't be asked"""
+        if not self.__drive_allowed:
+            return None
+        try:
+            return self.__worksheet.client.get_file_drive_metadata(self.__worksheet.spreadsheet_id)["modifiedTime"]
+        except APIError as e:
+            if e.code in (401, 403, 404):
+                # Drive API off for the project or the scope not granted; callers fall back to their own check
+                print(f"Drive metadata unavailable, checking the sheet for changes instead: {e}")
+                self.__drive_allowed = False
+            return None
+
+# Shared worksheet behaviour for the local backends; subclasses only store and fetch plain rows
+class GridStorage(abc.ABC):
+    def __init__(self, column_count):
+        self.column_count = column_count
+        self._lock = threading.RLock()
+        self._revision = 0  # Bumped on every write
+
+    # Storage primitives implemented by each local backend
+    @abc.abstractmethod
+    def _row_count(self):
+        pass
+
+    @abc.abstractmethod
+    def _read_rows(self, first_row, last_row):
+        """Rows first_row..last_row as lists of column_count strings"""
+
+    @abc.abstractmethod
+    def _write_cells(self, row_number, first_col, values):
+        pass
+
+    @abc.abstractmethod
+    def _append_rows(self, rows):
+        """Store rows after the last one and return the first new row number"""
+
+    @abc.abstractmethod
+    def _insert_row(self, row_number, values):
+        pass
+
+    @abc.abstractmethod
+    def _delete_row(self, row_number):
+        pass
+
+    def __normalise(self, values):
+        values = [_cell_text(value) for value in values]
+        if len(values) > self.column_count:
+            raise ValueError(f"Row has {len(values)} values but the table only has {self.column_count} columns")
+        return values + [""] * (self.column_count - len(values))
+
+    def __range_values(self, range_name):
+        first_row, first_col, last_row, last_col = parse_range(range_name)
+        with self._lock:
+            last_row = min(last_row or self._row_count(), self._row_count())
+            rows = self._read_rows(first_row, last_row) if last_row >= first_row else []
+        last_col = last_col or self.column_count
+        values = [_trim(row[first_col - 1:last_col]) for row in rows]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    # Worksheet API
+    def revision(self):
+        """Token that changes whenever the table is written"""
+        return self._revision
+
+    @property
+    def row_count(self):
+        with self._lock:
+            return self._row_count()
+
+    def row_values(self, row, **kwargs):
+        with self._lock:
+            rows = self._read_rows(row, row)
+        return _trim(rows[0]) if rows else []
+
+    def col_values(self, col, **kwargs):
+        with self._lock:
+            rows = self._read_rows(1, self._row_count())
+        return _trim([row[col - 1] for row in rows])
+
+    def get_all_values(self, **kwargs):
+        with self._lock:
+            rows = self._read_rows(1, self._row_count())
+        width = max((len(_trim(row)) for row in rows), default=0)
+        return [row[:width] for row in rows]
+
+    def get_all_records(self, head=1, **kwargs):
+        rows = self.get_all_values()
+        if len(rows) < head:
+            return []
+        headers = rows[head - 1]
+        return [dict(zip(headers, numericise_all(row))) for row in rows[head:]]
+
+    def get(self, range_name=None, **kwargs):
+        return self.__range_values(range_name) if range_name else self.get_all_values()
+
+    def batch_get(self, ranges, **kwargs):
+        return [self.__range_values(range_name) for range_name in ranges]
+
+    def append_row(self, values, **kwargs):
+        return self.append_rows([values], **kwargs)
+
+    def append_rows(self, values, **kwargs):
+        rows = [self.__normalise(row) for row in values]
+        with self._lock:
+            first_row = self._append_rows(rows)
+            self._revision += 1
+        last_row = first_row + len(rows) - 1
+        return {
+            "updates": {
+                "updatedRange": f"{rowcol_to_a1(first_row, 1)}:{rowcol_to_a1(last_row, self.column_count)}",
+                "updatedRows": len(rows),
+            }
+        }
+
+    def batch_update(self, data, **kwargs):
+        with self._lock:
+            for update in data:
+                first_row, first_col, _, _ = parse_range(update["range"])
+                for offset, values in enumerate(update["values"]):
+                    if first_col - 1 + len(values) > self.column_count:
+                        raise ValueError(f"Range {update['range']} is outside the table")
+                    self._write_cells(first_row + offset, first_col, [_cell_text(value) for value in values])
+            self._revision += 1
+        return {"totalUpdatedCells": sum(len(values) for update in data for values in update["values"])}
+
+    def update(self, values=None, range_name=None, **kwargs):
+        # Accept both update(values, range) and the older update(range, values) call order
+        if isinstance(values, str):
+            values, range_name = range_name, values
+        return self.batch_update([{"range": range_name or "A1", "values": values}])
+
+    def update_cell(self, row, col, value):
+        return self.batch_update([{"range": rowcol_to_a1(row, col), "values": [[value]]}])
+
+    def insert_row(self, values, index=1, **kwargs):
+        with self._lock:
+            self._insert_row(index, self.__normalise(values))
+            self._revision += 1
+
+    def delete_rows(self, start_index, end_index=None):
+        with self._lock:
+            for _ in range((end_index or start_index) - start_index + 1):
+                self._delete_row(start_index)
+            self._revision += 1
+
+    def findall(self, query, in_row=None, in_column=None, **kwargs):
+        query = str(query)
+        with self._lock:
+            rows = self._read_rows(1, self._row_count())
+        return [
+            Cell(row_number, col_number, value)
+            for row_number, row in enumerate(rows, start=1)
+            if in_row is None or row_number == in_row
+            for col_number, value in enumerate(row, start=1)
+            if value == query and (in_column is None or col_number == in_column)
+        ]
+
+# Keeps the table in a Python list; used for tests, benchmarks and demos
+class MemoryStorage(GridStorage):
+    def __init__(self, column_count):
+        super().__init__(column_count)
+        self.__rows = []
+
+    def _row_count(self):
+        return len(self.__rows)
+
+    def _read_rows(self, first_row, last_row):
+        return [list(row) for row in self.__rows[first_row - 1:last_row]]
+
+    def _write_cells(self, row_number, first_col, values):
+        while len(self.__rows) < row_number:
+            self.__rows.append([""] * self.column_count)
+        self.__rows[row_number - 1][first_col - 1:first_col - 1 + len(values)] = values
+
+    def _append_rows(self, rows):
+        first_row = len(self.__rows) + 1
+        self.__rows.extend(rows)
+        return first_row
+
+    def _insert_row(self, row_number, values):
+        self.__rows.insert(row_number - 1, values)
+
+    def _delete_row(self, row_number):
+        if row_number <= len(self.__rows):
+            del self.__rows[row_number - 1]
+
+# Keeps the table in a local SQLite database with indexes on the lookup columns
+class SQLiteStorage(GridStorage):
+    def __init__(self, path, table, column_count, indexed_columns=None):
+        super().__init__(column_count)
+        self.__table = table
+        self.__columns = [f"c{number}" for number in range(1, column_count + 1)]
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+
+        with self._lock, self.__connection:
+            column_sql = ", ".join(f"{column} TEXT NOT NULL DEFAULT ''" for column in self.__columns)
+            self.__connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (row_number INTEGER PRIMARY KEY, {column_sql})"
+            )
+            for name, column in (indexed_columns or {}).items():
+                self.__connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{table}_{name} ON {table} (c{column})"
+                )
+
+    def revision(self):
+        # data_version also changes when another process commits to the same database file
+        with self._lock:
+            return self._revision, self.__connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def _row_count(self):
+        return self.__connection.execute(f"SELECT COALESCE(MAX(row_number), 0) FROM {self.__table}").fetchone()[0]
+
+    def _read_rows(self, first_row, last_row):
+        found = {
+            row[0]: list(row[1:])
+            for row in self.__connection.execute(
+                f"SELECT row_number, {', '.join(self.__columns)} FROM {self.__table} "
+                "WHERE row_number BETWEEN ? AND ? ORDER BY row_number",
+                (first_row, last_row)
+            )
+        }
+        # Missing rows read back as blank, like empty rows in a sheet
+        return [found.get(number, [""] * self.column_count) for number in range(first_row, last_row + 1)]
+
+    def _write_cells(self, row_number, first_col, values):
+        columns = self.__columns[first_col - 1:first_col - 1 + len(values)]
+        with self.__connection:
+            self.__connection.execute(f"INSERT OR IGNORE INTO {self.__table} (row_number) VALUES (?)", (row_number,))
+            self.__connection.execute(
+                f"UPDATE {self.__table} SET {', '.join(f'{column} = ?' for column in columns)} WHERE row_number = ?",
+                (*values, row_number)
+            )
+
+    def _append_rows(self, rows):
+        first_row = self._row_count() + 1
+        placeholders = ", ".join("?" for _ in range(self.column_count + 1))
+        with self.__connection:
+            self.__connection.executemany(
+                f"INSERT INTO {self.__table} (row_number, {', '.join(self.__columns)}) VALUES ({placeholders})",
+                [(first_row + offset, *row) for offset, row in enumerate(rows)]
+            )
+        return first_row
+
+    def __shift_rows(self, from_row, step):
+        # Move through negative numbers so the primary key never collides mid-update
+        self.__connection.execute(
+            f"UPDATE {self.__table} SET row_number = -(row_number + ?) WHERE row_number >= ?", (step, from_row)
+        )
+        self.__connection.execute(f"UPDATE {self.__table} SET row_number = -row_number WHERE row_number < 0")
+
+    def _insert_row(self, row_number, values):
+        with self.__connection:
+            self.__shift_rows(row_number, 1)
+        self._write_cells(row_number, 1, values)
+
+    def _delete_row(self, row_number):
+        with self.__connection:
+            self.__connection.execute(f"DELETE FROM {self.__table} WHERE row_number = ?", (row_number,))
+            self.__shift_rows(row_number + 1, -1)
+
+# Local tables are opened once and shared by every database object in the process
+_open_tables = {}
+_open_tables_lock = threading.Lock()
+
+# Storage installed by hand (benchmarks, tests) wins over the configured backend
+_overrides = {}
+
+def use_storage(table, storage):
+    """Make open_storage(table) return storage; pass None to go back to the configured backend"""
+    if storage is None:
+        _overrides.pop(table, None)
+    else:
+        _overrides[table] = storage
+
+def open_storage(table, backend=None):
+    """Open the configured backend for 'bookings', 'users' or 'id_leases'"""
+    spec = TABLES[table]
+    if backend is None and table in _overrides:
+        return _overrides[table]
+    backend = backend or settings.STORAGE_BACKEND
+
+    if backend == "sheets":
+        # The registry hands back an already authorized, already opened worksheet
+        return SheetsStorage(get_registry().worksheet(spec["sheet_id"], spec.get("worksheet"), spec["columns"]))
+    if backend not in ("sqlite", "memory"):
+        raise ValueError(f"Unknown storage backend: {backend}")
+
+    with _open_tables_lock:
+        key = (backend, table)
+        if key not in _open_tables:
+            if backend == "sqlite":
+                _open_tables[key] = SQLiteStorage(settings.SQLITE_PATH, table, spec["columns"], spec["indexed_columns"])
+            else:
+                _open_tables[key] = MemoryStorage(spec["columns"])
+        return _open_tables[key]
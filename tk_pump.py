@@ -0,0 +1,30 @@
+# Tk widgets may only be touched from the main thread, so background work hands its results over
+# through a queue that the Tk event loop polls with widget.after.
+
+def pump_on_tk(widget, step, interval_ms, on_closed=None):
+    """Call step() from widget's Tk event loop every interval_ms until it returns False.
+
+    on_closed() runs instead once widget has been destroyed (e.g. its window was closed).
+    """
+    def closed():
+        if on_closed is not None:
+            on_closed()
+
+    def pump():
+        # after() keeps firing for a destroyed Toplevel, since it belongs to the interpreter, so ask the widget
+        try:
+            alive = widget.winfo_exists()
+        except Exception:
+            # The whole Tk interpreter is gone
+            alive = False
+        if not alive:
+            closed()
+            return
+        if step() is False:
+            return
+        try:
+            widget.after(interval_ms, pump)
+        except Exception:
+            closed()
+
+    widget.after(interval_ms, pump)
@@ -1,19 +1,112 @@
 import tkinter as tk
 from tkinter import messagebox
-import gspread
-from google.oauth2.service_account import Credentials
-import random
+import json
+import threading
+from gspread.utils import numericise_all
+from storage_backends import appended_row_number, open_storage
+from id_allocator import get_id_allocator
+from login_guard import get_login_guard
+import settings
+
+USER_HEADERS = ["ID", "Name", "Contact", "Email", "Passcode", "Address"]
+
+# The rules LandingPage.process_signup applies, shared with bulk uploads
+def signup_error(name, contact, email, passcode, address):
+    """The message to show for invalid signup details, or None if they are acceptable"""
+    if len(name) < 2:
+        return "Name must be at least 2 characters."
+    if not contact.isdigit() or not (10 <= len(contact) <= 13):
+        return "Contact number must be 10–13 digits."
+    if "@" not in email or "." not in email:
+        return "Please enter a valid email address."
+    if len(passcode) < 4 or not passcode.isalnum():
+        return "Password must be at least 4 alphanumeric characters."
+    if not all([name, contact, email, passcode, address]):
+        return "Please fill in all fields."
+    return None
+
+def _signup_fields(user):
+    """(name, contact, email, passcode, address) as text, from a dict keyed by header or a sequence"""
+    if isinstance(user, dict):
+        values = [user.get(header, user.get(header.lower(), "")) for header in USER_HEADERS[1:]]
+    else:
+        values = list(user)[:len(USER_HEADERS) - 1]
+        values += [""] * (len(USER_HEADERS) - 1 - len(values))
+    return ["" if value is None else str(value) for value in values]
+
+def upload_batches(rows, max_rows=None, max_bytes=None):
+    """Split rows into (offset of the first row, rows) runs that each fit in one append request"""
+    max_rows = max_rows or settings.USER_UPLOAD_MAX_ROWS
+    max_bytes = max_bytes or settings.USER_UPLOAD_MAX_BYTES
+    start, size = 0, 0
+    for offset, row in enumerate(rows):
+        row_size = len(json.dumps(row)) + 1
+        if offset > start and (offset - start >= max_rows or size + row_size > max_bytes):
+            yield start, rows[start:offset]
+            start, size = offset, 0
+        size += row_size
+    if start < len(rows):
+        yield start, rows[start:]
+
+# Every user row kept in memory by ID. The user sheet is append-only, so after one full read
+# only rows past last_row ever need fetching.
+class UserIndex:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.rows_by_id = {}  # ID -> {row number: raw values}; the old random IDs can repeat
+        self.last_row = 1  # Row 1 holds the headers
+        self.loaded = False
+
+    def clear(self):
+        self.rows_by_id.clear()
+        self.last_row = 1
+        self.loaded = False
+
+    def add(self, row_number, values, advance=True):
+        """Record a user row; advance=False leaves last_row alone so rows before it are still picked up"""
+        user_id = str(values[0]).strip() if values else ""
+        if user_id:
+            self.rows_by_id.setdefault(user_id, {})[row_number] = list(values)
+        if advance:
+            self.last_row = max(self.last_row, row_number)
+
+    def discard(self, user_id, row_number):
+        """Forget a row that no longer holds this ID"""
+        rows = self.rows_by_id.get(str(user_id).strip(), {})
+        rows.pop(row_number, None)
+        if not rows:
+            self.rows_by_id.pop(str(user_id).strip(), None)
+
+    def get(self, user_id):
+        """[(row number, raw values)] of every row with this ID, in sheet order"""
+        return sorted(self.rows_by_id.get(str(user_id).strip(), {}).items())
+
+_user_index = None
+_user_index_lock = threading.Lock()
+
+def get_user_index():
+    """The process-wide user index"""
+    global _user_index
+    with _user_index_lock:
+        if _user_index is None:
+            _user_index = UserIndex()
+        return _user_index
+
+def reset_user_index():
+    """Forget every indexed user, e.g. after switching storage backends"""
+    global _user_index
+    with _user_index_lock:
+        _user_index = None
 
 class UserInfoDatabase:
     def __init__(self):
-        self.__sheet_id = "13GKmBOKz_XvvAFdGGqSoDRS7UTlvf_YqUNSCdD6hceI"
-        self.__scopes = ['https://www.googleapis.com/auth/spreadsheets']
-        self.__creds = Credentials.from_service_account_file("credentials.json", scopes=self.__scopes)
-        self.__client = gspread.authorize(self.__creds)
-        self.__sheet = self.__client.open_by_key(self.__sheet_id).sheet1
+        # User table on the configured backend (Sheets, SQLite or in-memory)
+        self.__sheet = open_storage("users")
+        self.__index = get_user_index()  # Shared by every UserInfoDatabase in the process
+        self.__guard = get_login_guard()  # Answers repeated failed logins without a sheet read
         
         # Add headers if not present
-        expected_headers = ["ID", "Name", "Contact", "Email", "Passcode", "Address"]
+        expected_headers = USER_HEADERS
         current_headers = self.__sheet.row_values(1)
         if current_headers != expected_headers:
             self.__sheet.update('A1:F1', [expected_headers])
@@ -23,35 +116,141 @@ class UserInfoDatabase:
         """Private accessor for the sheet object"""
         return self.__sheet
 
-    # Generate a 4 numbered unique combination to be used for user account id
-    def __identification_assignment(self):
-        first_num = random.randint(1, 9)
-        second_num = random.randint(1, 9)
-        third_num = random.randint(1, 9)
-        fourth_num = random.randint(1, 9)
-        id = str(first_num) + str(second_num) + str(third_num) + str(fourth_num)
-        return id
-
     # Uploads user credentials during sign up
     def upload_user(self, name, contact, email, passcode, address):
         """Public method (unchanged interface)"""
-        user_id = self.__identification_assignment()
+        # IDs come from this process's leased block, so no sheet read is needed to keep them unique
+        user_id = get_id_allocator().next_id()
         row = [user_id, name, contact, email, passcode, address]
-        self.__get_sheet().append_row(row, value_input_option='RAW')
+        response = self.__get_sheet().append_row(row, value_input_option='RAW')
+        row_number = appended_row_number(response)
+        if row_number is not None:
+            with self.__index.lock:
+                # Rows other clients appended before ours are still fetched by the next refresh
+                self.__index.add(row_number, row, advance=False)
+        self.__guard.forget(user_id)
         return user_id
 
-    # Examines the whole sheet database and checks if the inputted email matches an account
+    # Bulk sign up, e.g. a corporate client's staff list
+    def upload_users(self, users):
+        """Validate and upload many users with a few batched appends.
+
+        users holds dicts keyed by header ("Name", "Contact", ...) or (name, contact, email, passcode, address)
+        sequences. Returns one {"row", "id", "error"} result per user, in order; id is None when the
+        user was rejected or their batch failed to upload.
+        """
+        results = []
+        accepted = []
+        for position, user in enumerate(users):
+            fields = _signup_fields(user)
+            error = signup_error(*fields)
+            results.append({"row": position, "id": None, "error": error})
+            if error is None:
+                accepted.append((position, fields))
+        if not accepted:
+            return results
+
+        # One lease covers every accepted user
+        user_ids = get_id_allocator().allocate(len(accepted))
+        rows = [[user_id] + fields for user_id, (_, fields) in zip(user_ids, accepted)]
+
+        for start, batch in upload_batches(rows):
+            try:
+                response = self.__get_sheet().append_rows(batch, value_input_option='RAW')
+            except Exception as e:
+                for position, _ in accepted[start:start + len(batch)]:
+                    results[position]["error"] = f"Failed to upload data: {e}"
+                continue
+            first_row = appended_row_number(response)
+            with self.__index.lock:
+                for offset, row in enumerate(batch):
+                    results[accepted[start + offset][0]]["id"] = row[0]
+                    self.__guard.forget(row[0])
+                    if first_row is not None:
+                        self.__index.add(first_row + offset, row, advance=False)
+        return results
+
+    def __load_index(self):
+        """Read the whole user sheet once"""
+        rows = self.__get_sheet().get_all_values()
+        self.__index.clear()
+        for row_number, values in enumerate(rows[1:], start=2):
+            self.__index.add(row_number, values)
+        self.__index.loaded = True
+
+    def __refresh_index(self):
+        """Read only the users appended since the last read"""
+        first_row = self.__index.last_row + 1
+        rows = self.__get_sheet().get(f"A{first_row}:F")
+        for row_number, values in enumerate(rows, start=first_row):
+            self.__index.add(row_number, values)
+
+    def __lookup(self, user_id):
+        """[(row number, raw values)] for a user ID, touching the sheet only on a miss"""
+        with self.__index.lock:
+            if not self.__index.loaded:
+                self.__load_index()
+                return self.__index.get(user_id)
+            entries = self.__index.get(user_id)
+            if not entries:
+                # The sheet is append-only, so a user the index doesn't know can only be in the new rows
+                self.__refresh_index()
+                entries = self.__index.get(user_id)
+            return entries
+
+    def __reread_rows(self, user_id, entries):
+        """Read the indexed rows of an ID again in one request, dropping any that no longer hold it"""
+        row_numbers = [row_number for row_number, _ in entries]
+        results = self.__get_sheet().batch_get([f"A{row_number}:F{row_number}" for row_number in row_numbers])
+        entries = []
+        with self.__index.lock:
+            for row_number, rows in zip(row_numbers, results):
+                values = list(rows[0]) if rows else []
+                if values and str(values[0]).strip() == user_id:
+                    self.__index.add(row_number, values, advance=False)
+                    entries.append((row_number, values))
+                else:
+                    self.__index.discard(user_id, row_number)
+        return entries
+
+    @staticmethod
+    def __credentials_match(values, email, passcode):
+        values = list(values) + [""] * (len(USER_HEADERS) - len(values))
+        return str(values[3]).strip().lower() == email and str(values[4]) == str(passcode)
+
+    # Looks the account up by ID in the shared user index and checks the email and passcode
     def find_user_by_credentials(self, user_id, email, passcode):
-        try:
-            email = email.strip().lower()
-            user_id = str(user_id).strip() 
-            records = self.__get_sheet().get_all_records()
-            
-            for row in records:
-                # Check all three credentials match
-                if (str(row.get("ID", ""))) == user_id and (row.get("Email", "")).strip().lower() == email and str(row.get("Passcode", "")) == str(passcode):
-                    return row
+        # Credentials that just failed, and IDs locked after repeated failures, are refused without a sheet read
+        if not self.__guard.allows(user_id, email, passcode):
             return None
+        try:
+            user = self.__check_credentials(user_id, email, passcode)
         except Exception as e:
             print(f"Error finding user: {e}")
-            return None
\ No newline at end of file
+            return None
+        # Only a definite mismatch counts as a failure; errors above are not held against the user
+        if user is None:
+            self.__guard.record_failure(user_id, email, passcode)
+        else:
+            self.__guard.record_success(user_id)
+        return user
+
+    def __check_credentials(self, user_id, email, passcode):
+        """The user's record if the ID exists and the email and passcode match, else None"""
+        email = email.strip().lower()
+        user_id = str(user_id).strip() 
+        entries = self.__lookup(user_id)
+        if not entries:
+            return None
+
+        # Several accounts may share an old random ID; any of them with matching credentials logs in
+        matched = [values for _, values in entries if self.__credentials_match(values, email, passcode)]
+        if not matched:
+            # The rows may have been edited in the sheet since we indexed them, so check them again
+            entries = self.__reread_rows(user_id, entries)
+            matched = [values for _, values in entries if self.__credentials_match(values, email, passcode)]
+            if not matched:
+                return None
+
+        values = list(matched[0]) + [""] * (len(USER_HEADERS) - len(matched[0]))
+        return dict(zip(USER_HEADERS, numericise_all(values[:len(USER_HEADERS)])))
\ No newline at end of file
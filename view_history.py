@@ -1,85 +1,321 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import gspread
-from google.oauth2.service_account import Credentials
+from tkinter import ttk, messagebox, filedialog
+import queue
+import threading
+from datetime import datetime
+from booking_queue_database import BookingDatabase, BOOKING_HEADERS
+from history_store import get_history_store, merge_history
+from tk_pump import pump_on_tk
+from booking_export import booking_day, export_bookings
+
+STATUS_COLUMN = BOOKING_HEADERS.index("Status")
+STAMP_COLUMN = BOOKING_HEADERS.index("Last Updated")
+TIME_FORMATS = ["%Y-%m-%d %H:%M:%S", "%Y-%m-%d %I:%M %p", "%Y-%m-%d %H:%M", "%I:%M %p"]
+
+def sort_key(value):
+    """Numbers sort numerically, times chronologically and everything else as text"""
+    if isinstance(value, (int, float)):
+        return (0, value, "")
+    text = str(value).strip()
+    if ":" in text:
+        # Pickup and dropoff times are stored with a 12-hour clock, which doesn't sort as text
+        for time_format in TIME_FORMATS:
+            try:
+                return (1, 0, datetime.strptime(text, time_format).strftime("%Y-%m-%d %H:%M:%S"))
+            except ValueError:
+                pass
+    return (2, 0, text.lower())
+
+# Shows a long history in a Treeview that only ever holds one screenful of rows.
+# Scrolling swaps new values into the same items instead of creating one item per booking.
+class HistoryTable:
+    def __init__(self, parent, headers, page_size=20, prefetch=100, on_sort=None):
+        self.headers = headers
+        self.page_size = page_size
+        self.prefetch = prefetch  # Rows formatted ahead of (and behind) the visible page
+        self.on_sort = on_sort
+        self.__rows = []
+        self.__offset = 0
+        self.__window_start = 0
+        self.__window = []  # Display values for the rows around the visible page
+
+        frame = tk.Frame(parent)
+        frame.pack(fill='both', expand=True, padx=10, pady=10)
+
+        self.tree = ttk.Treeview(frame, columns=headers, show='headings', height=page_size)
+        vsb = ttk.Scrollbar(frame, orient="vertical", command=self.__on_scrollbar)
+        hsb = ttk.Scrollbar(frame, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=hsb.set)
+        self.vsb = vsb
+        vsb.pack(side='right', fill='y')
+        hsb.pack(side='bottom', fill='x')
+        self.tree.pack(fill='x', anchor='n')
+
+        # Set column headings; clicking one sorts by it
+        for header in headers:
+            self.tree.heading(header, text=header, command=lambda header=header: self.__sort_clicked(header))
+            self.tree.column(header, anchor='center', width=120)
+
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self.__on_wheel)
+
+    @property
+    def row_count(self):
+        return len(self.__rows)
+
+    def set_rows(self, rows, keep_position=False):
+        """Show a new (filtered or sorted) list of rows, from the top unless keep_position is set"""
+        self.__rows = rows
+        self.__window_start = 0
+        self.__window = []
+        self.scroll_to(self.__offset if keep_position else 0)
+
+    def add_rows(self, rows):
+        """Append rows that arrived after the table was shown, keeping the scroll position"""
+        self.__rows.extend(rows)
+        self.scroll_to(self.__offset)
+
+    def scroll_to(self, offset):
+        last_offset = max(0, len(self.__rows) - self.page_size)
+        self.__offset = max(0, min(int(offset), last_offset))
+        self.__render()
+
+    def __display_values(self, row):
+        # Pad or trim row to match column count
+        row = list(row[:len(self.headers)])
+        return row + [""] * (len(self.headers) - len(row))
+
+    def __visible_values(self):
+        """Values for the visible page, formatting a new prefetch window when scrolled past the old one"""
+        end = min(self.__offset + self.page_size, len(self.__rows))
+        window_end = self.__window_start + len(self.__window)
+        if self.__offset < self.__window_start or end > window_end:
+            self.__window_start = max(0, self.__offset - self.prefetch // 2)
+            self.__window = [
+                self.__display_values(row)
+                for row in self.__rows[self.__window_start:end + self.prefetch]
+            ]
+        first = self.__offset - self.__window_start
+        return self.__window[first:first + end - self.__offset]
+
+    def __render(self):
+        visible = self.__visible_values()
+        items = self.tree.get_children()
+        for position, values in enumerate(visible):
+            if position < len(items):
+                self.tree.item(items[position], values=values)
+            else:
+                self.tree.insert("", "end", values=values)
+        if len(items) > len(visible):
+            self.tree.delete(*items[len(visible):])
+
+        total = len(self.__rows)
+        if total:
+            self.vsb.set(self.__offset / total, (self.__offset + len(visible)) / total)
+        else:
+            self.vsb.set(0, 1)
+
+    def __on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(amount) * len(self.__rows))
+        elif action == "scroll":
+            step = self.page_size if unit == "pages" else 1
+            self.scroll_to(self.__offset + int(amount) * step)
+
+    def __on_wheel(self, event):
+        direction = -1 if event.num == 4 or event.delta > 0 else 1
+        self.scroll_to(self.__offset + direction * 3)
+        return "break"
+
+    def __sort_clicked(self, header):
+        if self.on_sort:
+            self.on_sort(header)
+
+# Reads a client's history on a worker thread and hands it to the Tk thread a chunk at a time
+class HistoryLoader:
+    def __init__(self, read_chunks):
+        self.__read_chunks = read_chunks  # Called on the worker thread; yields (chunk, total) pairs
+        self.__cancelled = threading.Event()
+        self.__results = queue.Queue()
+
+    @property
+    def cancelled(self):
+        return self.__cancelled.is_set()
+
+    def cancel(self):
+        """Stop after the chunk currently being read; nothing more is delivered"""
+        self.__cancelled.set()
+
+    def start(self, widget, on_chunk, on_done, interval_ms=50):
+        """Start reading; on_chunk(chunk, total) and on_done(error) run on widget's Tk thread"""
+        threading.Thread(target=self.__run, name="history-loader", daemon=True).start()
+
+        def step():
+            if self.cancelled:
+                return False
+            while True:
+                try:
+                    kind, chunk, total = self.__results.get_nowait()
+                except queue.Empty:
+                    return True
+                if kind == "chunk":
+                    on_chunk(chunk, total)
+                else:
+                    on_done(chunk)
+                    return False
+
+        # Destroying widget (e.g. closing its window) stops the reader too
+        pump_on_tk(widget, step, interval_ms, on_closed=self.cancel)
+
+    def __run(self):
+        try:
+            for chunk, total in self.__read_chunks():
+                if self.cancelled:
+                    return
+                self.__results.put(("chunk", chunk, total))
+            self.__results.put(("done", None, None))
+        except Exception as e:
+            print(f"Error loading booking history: {e}")
+            self.__results.put(("done", e, None))
 
 class ManageHistory:
     def __init__(self, user_id):
-        self.__sheet_id = "1i3lWKS-o8VjeGykXbRP27MZS0xniY490DAibQgNMwoE"  # Made private
-        self.__scopes = ['https://www.googleapis.com/auth/spreadsheets']  # Made private
-        self.__creds = Credentials.from_service_account_file("credentials.json", scopes=self.__scopes)  # Made private
-        self.__client = gspread.authorize(self.__creds)  # Made private
-        self.__sheet = self.__client.open_by_key(self.__sheet_id).sheet1  # Made private
+        self.__database = BookingDatabase()  # Made private; shares the process-wide booking cache
+        self.__store = get_history_store()  # This user's rows as of the last time history was opened
+        self.__rows = None  # This user's rows, fetched once and then filtered and sorted in memory
         self.user_id = user_id  # Kept public as it's used externally
 
-    def __get_sheet(self):
-        # Private method to safely access the sheet
-        return self.__sheet
-
     def all_user_id(self):
-        all_data = self.__get_sheet().get_all_records()
+        all_data = self.__database.get_all_bookings()
         client_ids = [row['Client ID'] for row in all_data]
         return client_ids
 
+    @staticmethod
+    def __to_rows(records):
+        return [[record.get(header, "") for header in BOOKING_HEADERS] for record in records]
+
+    def __refresh(self, stored):
+        """Bring stored rows up to date with the sheet and save them; None if the sheet couldn't be read"""
+        since = self.__store.refresh_since(self.user_id) if stored is not None else None
+        records, booking_ids = self.__database.get_client_changes(self.user_id, since)
+        if records is None:
+            return None
+        rows = merge_history(stored, self.__to_rows(records), booking_ids)
+        if since is not None and len(rows) < len([booking_id for booking_id in booking_ids if booking_id]):
+            # A booking we never stored has an older stamp (e.g. it was moved to this client), so read everything once
+            records, booking_ids = self.__database.get_client_changes(self.user_id)
+            if records is None:
+                return None
+            rows = merge_history(None, self.__to_rows(records), booking_ids)
+        self.__store.save(self.user_id, rows, STAMP_COLUMN)
+        return rows
+
+    def fetch_rows(self):
+        # Start from the rows stored on disk and only read bookings changed since the last refresh
+        stored = self.__store.load(self.user_id)
+        matching_rows = self.__refresh(stored)
+        if matching_rows is None:
+            matching_rows = stored or []
+        self.__rows = matching_rows
+        return matching_rows
+
+    def query_rows(self, status=None, date_from=None, date_to=None, sort_by=None, descending=False):
+        """Filter by status and/or date range (YYYY-MM-DD) and sort by a column, without going back to the sheet"""
+        rows = self.__rows if self.__rows is not None else self.fetch_rows()
+        if status:
+            rows = [row for row in rows if str(row[STATUS_COLUMN]) == status]
+        if date_from or date_to:
+            rows = [
+                row for row in rows
+                if booking_day(row)
+                and (not date_from or booking_day(row) >= date_from)
+                and (not date_to or booking_day(row) <= date_to)
+            ]
+        if sort_by:
+            column = BOOKING_HEADERS.index(sort_by)
+            rows = sorted(rows, key=lambda row: sort_key(row[column]), reverse=descending)
+        return list(rows)
+
+    def export_history(self, path, format=None, status=None, date_from=None, date_to=None):
+        """Stream this user's bookings (optionally filtered) to a CSV or Parquet file; returns the row count"""
+        return export_bookings(
+            path, format, self.__database, client_id=self.user_id,
+            status=status, date_from=date_from, date_to=date_to
+        )
+
     def print_rows(self):
-        # Get all rows matching user_id and show them in a new window
-        client_ids = self.all_user_id()
-        matching_rows = []
-        all_cells = []
-
-        for client_id in client_ids:
-            if client_id == self.user_id:
-                all_cells = self.__get_sheet().findall(str(client_id))
-
-        for cell in all_cells:
-            row_data = self.__get_sheet().row_values(cell.row)
-            matching_rows.append(row_data)
-            print(row_data)
-
-        if matching_rows:
-            self.show_history_window(matching_rows)
-        else:
-            messagebox.showinfo("No History Found", "You have no booking history.")
+        # Open the history window straight away from the rows stored on disk, then bring it up to date.
+        # A user seen for the first time has their rows streamed in as they are read.
+        stored = self.__store.load(self.user_id)
+        self.show_history_window(stored, stream=True, stored=stored is not None)
 
-    def show_history_window(self, rows):
-        # Display booking history in a Treeview table
+    def show_history_window(self, rows=None, stream=False, stored=False):
+        # Display booking history in a paged Treeview table with filters
+        rows = list(rows or [])
+        self.__rows = rows
         window = tk.Toplevel()
         window.title("Your Booking History")
-        window.geometry("1200x500")
+        window.geometry("1200x560")
 
-        # Column headers
-        headers = [
-            "Booking ID", "Client ID", "Client Name", "Pickup Location", "Destination",
-            "Vehicle Type", "Driver Name", "Distance (km)", "Fare (₱)", "Booking Type",
-            "Pickup Time", "Dropoff Time", "Status", "Last Updated"
-        ]
+        # Filters: status and a pickup date range
+        controls = tk.Frame(window)
+        controls.pack(fill='x', padx=10, pady=(10, 0))
 
-        tree = ttk.Treeview(window, columns=headers, show='headings')
-        tree.pack(fill='both', expand=True, padx=10, pady=10)
+        statuses = {str(row[STATUS_COLUMN]) for row in rows if len(row) > STATUS_COLUMN}
+        status_var = tk.StringVar(value="All")
+        tk.Label(controls, text="Status:").pack(side='left')
+        status_box = ttk.Combobox(controls, textvariable=status_var, values=["All"] + sorted(statuses), state="readonly", width=12)
+        status_box.pack(side='left', padx=(5, 15))
 
-        # Set column headings
-        for header in headers:
-            tree.heading(header, text=header)
-            tree.column(header, anchor='center', width=120)
+        tk.Label(controls, text="From (YYYY-MM-DD):").pack(side='left')
+        date_from = tk.Entry(controls, width=12)
+        date_from.pack(side='left', padx=(5, 15))
+        tk.Label(controls, text="To:").pack(side='left')
+        date_to = tk.Entry(controls, width=12)
+        date_to.pack(side='left', padx=(5, 15))
 
-        # Insert data rows
-        for row in rows:
-            # Pad or trim row to match column count
-            row_data = row[:len(headers)] + [""] * (len(headers) - len(row))
-            tree.insert("", "end", values=row_data)
+        count_label = tk.Label(controls, text="")
+        count_label.pack(side='right')
 
-        # Scrollbars
-        vsb = ttk.Scrollbar(window, orient="vertical", command=tree.yview)
-        vsb.pack(side='right', fill='y')
-        tree.configure(yscrollcommand=vsb.set)
+        sorting = {"column": None, "descending": False}
 
-        hsb = ttk.Scrollbar(window, orient="horizontal", command=tree.xview)
-        hsb.pack(side='bottom', fill='x')
-        tree.configure(xscrollcommand=hsb.set)
+        def filtering():
+            return status_var.get() != "All" or date_from.get().strip() or date_to.get().strip() or sorting["column"]
+
+        def refresh(*_, keep_position=False):
+            status = status_var.get()
+            shown = self.query_rows(
+                status=None if status == "All" else status,
+                date_from=date_from.get().strip() or None,
+                date_to=date_to.get().strip() or None,
+                sort_by=sorting["column"],
+                descending=sorting["descending"]
+            )
+            table.set_rows(shown, keep_position=keep_position)
+            count_label.config(text=f"{len(shown)} of {len(self.__rows)} bookings")
+
+        def sort_by(header):
+            # Clicking the same heading again flips the order
+            if sorting["column"] == header:
+                sorting["descending"] = not sorting["descending"]
+            else:
+                sorting["column"], sorting["descending"] = header, False
+            refresh()
+
+        tk.Button(controls, text="Apply", command=refresh).pack(side='left')
+        status_box.bind("<<ComboboxSelected>>", refresh)
+        date_from.bind("<Return>", refresh)
+        date_to.bind("<Return>", refresh)
+
+        table = HistoryTable(window, BOOKING_HEADERS, on_sort=sort_by)
+        refresh()
+
+        buttons = tk.Frame(window)
+        buttons.pack(fill='x', padx=10, pady=10)
 
         # Close button
         btn_close = tk.Button(
-            window,
+            buttons,
             text="Close",
             command=window.destroy,
             bg="#CC5500",
@@ -87,4 +323,109 @@ class ManageHistory:
             font=('Arial', 10, 'bold'),
             padx=10, pady=5
         )
-        btn_close.pack(pady=10)
\ No newline at end of file
+        btn_close.pack(side='right')
+
+        def export():
+            path = filedialog.asksaveasfilename(
+                parent=window,
+                defaultextension=".csv",
+                filetypes=[("CSV", "*.csv"), ("Parquet", "*.parquet")]
+            )
+            if not path:
+                return
+            status = status_var.get()
+            filters = {
+                "status": None if status == "All" else status,
+                "date_from": date_from.get().strip() or None,
+                "date_to": date_to.get().strip() or None
+            }
+            def exported(written, _):
+                messagebox.showinfo("Export Complete", f"Saved {written} bookings to {path}", parent=window)
+
+            def export_done(error):
+                if error is not None:
+                    messagebox.showerror("Export Failed", str(error), parent=window)
+
+            # The export reads the sheet, so run it off the Tk thread like the history load
+            exporter = HistoryLoader(lambda: [(self.export_history(path, **filters), None)])
+            exporter.start(window, exported, export_done)
+
+        tk.Button(buttons, text="Export...", command=export).pack(side='right', padx=10)
+
+        if not stream:
+            return
+
+        # Progress of the background load, with a button to stop it early
+        progress_label = tk.Label(buttons, text="Checking for changes..." if stored else "Loading your bookings...")
+        progress_label.pack(side='left')
+        progress = ttk.Progressbar(buttons, mode='indeterminate', length=250)
+        progress.pack(side='left', padx=10)
+        progress.start(10)
+
+        if stored:
+            # One chunk: the stored rows with every change since the watermark applied
+            stored_rows = list(rows)
+            loader = HistoryLoader(lambda: [(self.__refresh(stored_rows), None)])
+        else:
+            loader = HistoryLoader(lambda: self.__database.iter_bookings_for_client(self.user_id))
+
+        def stop_loading():
+            loader.cancel()
+            progress.stop()
+            btn_cancel.config(state=tk.DISABLED)
+            progress_label.config(text=f"Stopped after {len(self.__rows)} bookings")
+
+        btn_cancel = tk.Button(buttons, text="Cancel", command=stop_loading)
+        btn_cancel.pack(side='left')
+
+        unreadable = []
+
+        def on_refreshed(rows, _):
+            if rows is None:
+                unreadable.append(True)
+                return
+            self.__rows[:] = rows
+            statuses.update(str(row[STATUS_COLUMN]) for row in rows)
+            status_box.config(values=["All"] + sorted(statuses))
+            refresh(keep_position=True)
+
+        def on_chunk(records, total):
+            new_rows = self.__to_rows(records)
+            self.__rows.extend(new_rows)
+            for row in new_rows:
+                statuses.add(str(row[STATUS_COLUMN]))
+            status_box.config(values=["All"] + sorted(statuses))
+
+            if filtering():
+                refresh(keep_position=True)
+            else:
+                table.add_rows(new_rows)
+                count_label.config(text=f"{len(self.__rows)} of {len(self.__rows)} bookings")
+
+            progress.stop()
+            progress.config(mode='determinate', maximum=max(total, 1), value=len(self.__rows))
+            progress_label.config(text=f"Loaded {len(self.__rows)} of {total} bookings")
+
+        def on_done(error):
+            progress.stop()
+            btn_cancel.config(state=tk.DISABLED)
+            if error is not None:
+                progress_label.config(text=f"Could not load every booking: {error}")
+            elif unreadable:
+                progress_label.config(text="Could not check for changes; showing saved history")
+            elif not self.__rows:
+                window.destroy()
+                messagebox.showinfo("No History Found", "You have no booking history.")
+            else:
+                progress_label.config(text=f"Loaded {len(self.__rows)} bookings")
+                if not stored:
+                    # Next time the window opens from disk
+                    self.__store.save(self.user_id, self.__rows, STAMP_COLUMN)
+
+        def on_close(event):
+            # Closing the window stops any reads that haven't started yet
+            if event.widget is window:
+                loader.cancel()
+
+        window.bind("<Destroy>", on_close)
+        loader.start(window, on_refreshed if stored else on_chunk, on_done)
\ No newline at end of file